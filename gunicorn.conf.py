@@ -0,0 +1,55 @@
+# gunicorn.conf.py
+# Production server configuration: gunicorn -c gunicorn.conf.py
+import multiprocessing
+import os
+
+# The application modules import each other relative to src/
+chdir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src')
+wsgi_app = 'app:create_app()'
+
+bind = f"{os.getenv('FLASK_HOST', '0.0.0.0')}:{os.getenv('FLASK_PORT', '5000')}"
+workers = int(os.getenv('GUNICORN_WORKERS', multiprocessing.cpu_count()))
+threads = int(os.getenv('GUNICORN_THREADS', 8))
+worker_class = 'gthread'
+timeout = 30
+
+# Load the app once in the master so configuration, Firebase credentials and
+# the warmed stock metadata cache are shared by every worker. gRPC channels are
+# not fork-safe, so the master must not open Firestore clients; each worker
+# opens its own after fork instead.
+preload_app = True
+os.environ.setdefault('WARMUP_FIRESTORE', 'False')
+
+# How long the master waits for the startup warmup before forking workers
+WARMUP_JOIN_TIMEOUT = 30  # seconds
+
+def when_ready(server):
+    """Warm the caches in the master so every worker inherits them"""
+    from app import start_warmup
+    thread = start_warmup(server.app.wsgi())
+    
+    # Let the warmup finish so its threads hold no locks when workers fork
+    if thread:
+        thread.join(WARMUP_JOIN_TIMEOUT)
+        if thread.is_alive():
+            server.log.warning("Warmup still running; forking workers anyway")
+
+def post_fork(server, worker):
+    """Discard Firestore clients and thread pools inherited from the master"""
+    from services.firebase_service import reset_db_pool
+    from utils.executor import reset_executors
+    reset_db_pool()
+    
+    # A forked child has none of the master's pool threads, so inherited
+    # executors would never run submitted work
+    reset_executors()
+
+def post_worker_init(worker):
+    """Open this worker's Firestore clients before it accepts requests"""
+    import firebase_admin
+    from services.firebase_service import warm_db
+    if firebase_admin._apps:
+        try:
+            warm_db()
+        except Exception as e:
+            worker.log.warning(f"Firestore warmup failed: {str(e)}")
@@ -2,7 +2,8 @@
 from firebase_admin import auth, firestore
 from flask import Blueprint, jsonify, request
 
-from utils.validators import token_required, validate_user_data
+from services.firebase_service import get_db
+from utils.validators import get_cached_user, token_required, validate_user_data
 
 bp = Blueprint('auth', __name__)
 
@@ -24,7 +25,7 @@ def register():
         )
         
         # Create user profile in Firestore
-        db = firestore.client()
+        db = get_db()
         db.collection('users').document(user.uid).set({
             'email': data['email'],
             'created_at': firestore.SERVER_TIMESTAMP,
@@ -73,10 +74,11 @@ def login():
 def get_profile(current_user):
     """Get current user profile"""
     try:
-        user = auth.get_user(current_user)
+        # Reuses the record token_required already looked up
+        user = get_cached_user(current_user)
         
         # Get additional profile data from Firestore
-        db = firestore.client()
+        db = get_db()
         profile_doc = db.collection('users').document(current_user).get()
         profile_data = profile_doc.to_dict() if profile_doc.exists else {}
         
@@ -1,15 +1,16 @@
 # src/api/crypto.py
 
+import functools
 from datetime import datetime
 
-import requests
-from firebase_admin import firestore
 from flask import Blueprint, jsonify, request
 
+from services.crypto_service import apply_purchase, get_crypto_prices
+from services.firebase_service import get_db
+from utils.json_provider import dump_json, json_bytes_response
 from utils.validators import token_required
 
 bp = Blueprint('crypto', __name__)
-db = firestore.client()
 
 # Supported cryptocurrencies - limited to 3 as per requirements
 SUPPORTED_CRYPTOS = {
@@ -18,35 +19,31 @@ SUPPORTED_CRYPTOS = {
     'USDT': 'Tether'
 }
 
+# Static payload for /crypto/available
+_AVAILABLE_RESPONSE = {
+    'cryptos': [
+        {'symbol': symbol, 'name': name}
+        for symbol, name in SUPPORTED_CRYPTOS.items()
+    ],
+    'message': 'List of supported cryptocurrencies'
+}
+
+@functools.lru_cache(maxsize=None)
+def _available_body() -> bytes:
+    """_AVAILABLE_RESPONSE serialized once per process"""
+    return dump_json(_AVAILABLE_RESPONSE)
+
 def get_crypto_price(symbol: str) -> float:
     """
     Get current price for a cryptocurrency using CoinGecko API
     """
-    try:
-        # Using CoinGecko's free API
-        symbol_mapping = {'BTC': 'bitcoin', 'ETH': 'ethereum', 'USDT': 'tether'}
-        coin_id = symbol_mapping.get(symbol)
-        if not coin_id:
-            raise ValueError(f"Unsupported cryptocurrency: {symbol}")
-            
-        url = f"https://api.coingecko.com/api/v3/simple/price?ids={coin_id}&vs_currencies=usd"
-        response = requests.get(url)
-        data = response.json()
-        return data[coin_id]['usd']
-    except Exception as e:
-        raise Exception(f"Error fetching crypto price: {str(e)}")
+    return get_crypto_prices([symbol])[symbol]
 
 @bp.route('/crypto/available', methods=['GET'])
 @token_required
 def get_available_crypto(current_user):
     """Get list of supported cryptocurrencies"""
-    return jsonify({
-        'cryptos': [
-            {'symbol': symbol, 'name': name}
-            for symbol, name in SUPPORTED_CRYPTOS.items()
-        ],
-        'message': 'List of supported cryptocurrencies'
-    })
+    return json_bytes_response(_available_body())
 
 @bp.route('/crypto/price/<symbol>', methods=['GET'])
 @token_required
@@ -61,7 +58,7 @@ def get_crypto_current_price(current_user, symbol):
             'symbol': symbol,
             'name': SUPPORTED_CRYPTOS[symbol],
             'price_usd': price,
-            'timestamp': datetime.now().isoformat()
+            'timestamp': datetime.now()
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -87,52 +84,10 @@ def add_to_crypto_portfolio(current_user):
         # Get current price for calculation
         current_price = get_crypto_price(symbol)
         
+        db = get_db()
         portfolio_ref = db.collection('crypto_portfolios').document(current_user)
-        portfolio = portfolio_ref.get()
-        
-        if portfolio.exists:
-            portfolio_data = portfolio.to_dict()
-            assets = portfolio_data.get('assets', {})
-            
-            if symbol in assets:
-                # Update existing position
-                old_quantity = assets[symbol]['quantity']
-                old_value = assets[symbol]['avg_price'] * old_quantity
-                new_value = current_price * quantity
-                total_quantity = old_quantity + quantity
-                avg_price = (old_value + new_value) / total_quantity
-                
-                assets[symbol] = {
-                    'quantity': total_quantity,
-                    'avg_price': avg_price,
-                    'last_updated': datetime.now().isoformat()
-                }
-            else:
-                # Add new position
-                assets[symbol] = {
-                    'quantity': quantity,
-                    'avg_price': current_price,
-                    'last_updated': datetime.now().isoformat()
-                }
-            
-            portfolio_ref.update({
-                'assets': assets,
-                'updated_at': firestore.SERVER_TIMESTAMP
-            })
-        else:
-            # Create new portfolio
-            portfolio_ref.set({
-                'user_id': current_user,
-                'assets': {
-                    symbol: {
-                        'quantity': quantity,
-                        'avg_price': current_price,
-                        'last_updated': datetime.now().isoformat()
-                    }
-                },
-                'created_at': firestore.SERVER_TIMESTAMP,
-                'updated_at': firestore.SERVER_TIMESTAMP
-            })
+        apply_purchase(db.transaction(), portfolio_ref, current_user,
+                       symbol, quantity, current_price)
             
         return jsonify({
             'message': 'Cryptocurrency added to portfolio successfully',
@@ -147,8 +102,13 @@ def add_to_crypto_portfolio(current_user):
 @bp.route('/crypto/portfolio', methods=['GET'])
 @token_required
 def get_crypto_portfolio(current_user):
-    """Get user's cryptocurrency portfolio with current values"""
+    """
+    Get user's cryptocurrency portfolio with current values
+    The whole portfolio lives in one document, so this costs one Firestore read
+    plus one batched CoinGecko request regardless of the number of assets
+    """
     try:
+        db = get_db()
         portfolio_ref = db.collection('crypto_portfolios').document(current_user)
         portfolio = portfolio_ref.get()
         
@@ -165,8 +125,11 @@ def get_crypto_portfolio(current_user):
         current_portfolio = []
         total_value = 0
         
+        # One batched request covering only the symbols this portfolio holds
+        prices = get_crypto_prices(list(assets))
+        
         for symbol, data in assets.items():
-            current_price = get_crypto_price(symbol)
+            current_price = prices[symbol]
             quantity = data['quantity']
             avg_price = data['avg_price']
             current_value = quantity * current_price
@@ -187,7 +150,7 @@ def get_crypto_portfolio(current_user):
             'portfolio': current_portfolio,
             'total_value': total_value,
             'asset_count': len(current_portfolio),
-            'last_updated': datetime.now().isoformat()
+            'last_updated': datetime.now()
         })
         
     except Exception as e:
@@ -1,70 +1,142 @@
 # src/api/stocks.py
 from datetime import datetime
 
+import requests
 import yfinance as yf
 from firebase_admin import firestore
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, current_app, jsonify, request
+from google.api_core.exceptions import AlreadyExists, NotFound
 
+from services.firebase_service import get_db
+from utils.cache import TTLCache
+from utils.executor import SharedExecutor
+from utils.json_provider import dump_json, json_bytes_response
 from utils.validators import token_required, validate_stock_data
 
 bp = Blueprint('stocks', __name__)
-db = firestore.client()
 
-# List of allowed technology stocks
-ALLOWED_TECH_STOCKS = ['AAPL', 'GOOGL', 'MSFT', 'AMZN', 'META', 'NVDA', 'TSLA', 'AMD', 'INTC', 'CRM']
+# List of allowed technology stocks, in display order
+_ALLOWED_SYMBOLS = ('AAPL', 'GOOGL', 'MSFT', 'AMZN', 'META', 'NVDA', 'TSLA', 'AMD', 'INTC', 'CRM')
+ALLOWED_TECH_STOCKS = frozenset(_ALLOWED_SYMBOLS)
+
+# Yahoo lookups are independent blocking HTTP calls, so run them concurrently
+YAHOO_WORKERS = len(ALLOWED_TECH_STOCKS)
+_executor = SharedExecutor(YAHOO_WORKERS)
+
+# Name/sector/currency rarely change, so keep them for an hour
+STOCK_INFO_CACHE_TTL = 3600  # seconds
+_INFO_CACHE = TTLCache(ttl=STOCK_INFO_CACHE_TTL)
+
+# Serialized /available body, built from the same metadata
+_AVAILABLE_CACHE = TTLCache(ttl=STOCK_INFO_CACHE_TTL)
 
 def validate_stock_symbol(symbol):
     """Validate stock symbol"""
     return symbol in ALLOWED_TECH_STOCKS
 
+def _fetch_stock_info(symbol):
+    """Fetch summary metadata for a single stock"""
+    info = yf.Ticker(symbol).info
+    return {
+        'name': info.get('longName', symbol),
+        'sector': info.get('sector', 'Technology'),
+        'currency': info.get('currency', 'USD')
+    }
+
+def get_stock_info(symbol):
+    """Get summary metadata for a stock, cached for STOCK_INFO_CACHE_TTL seconds"""
+    stock_info = _INFO_CACHE.get(symbol)
+    if stock_info is None:
+        stock_info = _fetch_stock_info(symbol)
+        _INFO_CACHE.set(symbol, stock_info)
+    return stock_info
+
+def get_all_stock_info():
+    """Get summary metadata for every allowed stock, fetching uncached ones concurrently"""
+    return dict(zip(
+        _ALLOWED_SYMBOLS,
+        _executor.map(get_stock_info, _ALLOWED_SYMBOLS)
+    ))
+
+# A failed fast_info lookup raises HTTP errors from requests, or lookup and
+# type errors when Yahoo returns missing or partial quote data
+_FAST_INFO_ERRORS = (requests.RequestException, KeyError, IndexError, TypeError, ValueError)
+
+def _fetch_quote(stock):
+    """
+    Fetch latest price and previous close for a ticker
+    Uses the lightweight fast_info quote, falling back to history + info
+    Returns: Tuple of (latest_price, prev_close), or None if no data is available
+    """
+    try:
+        fast_info = stock.fast_info
+        latest_price = fast_info['last_price']
+        prev_close = fast_info['previous_close']
+        if latest_price is not None and prev_close:
+            return latest_price, prev_close
+    except _FAST_INFO_ERRORS as e:
+        current_app.logger.debug("fast_info failed for %s, using history: %s", stock.ticker, e)
+    
+    real_time = stock.history(period='1d')
+    if real_time.empty:
+        return None
+    
+    latest_price = real_time['Close'].iloc[-1]
+    prev_close = stock.info.get('previousClose', latest_price)
+    return latest_price, prev_close
+
+def _fetch_holding(symbol, quantity):
+    """Fetch current price and value for a single portfolio holding"""
+    stock = yf.Ticker(symbol)
+    current_price = stock.history(period='1d')['Close'].iloc[-1]
+    stock_value = current_price * quantity
+    return {
+        'symbol': symbol,
+        'quantity': quantity,
+        'current_price': round(current_price, 2),
+        'total_value': round(stock_value, 2),
+        'company_name': get_stock_info(symbol)['name']
+    }, stock_value
+
 @bp.route('/available', methods=['GET'])
 @token_required
 def get_available_stocks(current_user):
     """Get list of available technology stocks"""
     try:
-        stocks_data = {}
-        for symbol in ALLOWED_TECH_STOCKS:
-            stock = yf.Ticker(symbol)
-            info = stock.info
-            stocks_data[symbol] = {
-                'name': info.get('longName', symbol),
-                'sector': info.get('sector', 'Technology'),
-                'currency': info.get('currency', 'USD')
-            }
+        body = _AVAILABLE_CACHE.get('body')
+        if body is None:
+            stocks_data = get_all_stock_info()
+            body = dump_json({
+                'stocks': stocks_data,
+                'count': len(ALLOWED_TECH_STOCKS),
+                'message': 'List of available technology stocks'
+            })
+            _AVAILABLE_CACHE.set('body', body)
             
-        return jsonify({
-            'stocks': stocks_data,
-            'count': len(ALLOWED_TECH_STOCKS),
-            'message': 'List of available technology stocks'
-        })
+        return json_bytes_response(body)
     except Exception as e:
         return jsonify({'error': f'Error fetching stocks: {str(e)}'}), 500
 
-@bp.route('/price/<symbol>', methods=['GET'])
+# Unknown symbols are rejected with a 404 by the URL router
+@bp.route(f"/price/<any({','.join(_ALLOWED_SYMBOLS)}):symbol>", methods=['GET'])
 @token_required
 def get_stock_price(current_user, symbol):
     """Get real-time price for a specific stock"""
-    if not validate_stock_symbol(symbol):
-        return jsonify({'error': 'Invalid stock symbol'}), 400
-    
     try:
-        stock = yf.Ticker(symbol)
-        real_time = stock.history(period='1d')
+        quote = _fetch_quote(yf.Ticker(symbol))
         
-        if real_time.empty:
+        if quote is None:
             return jsonify({'error': 'No data available for this stock'}), 404
         
-        latest_price = real_time['Close'].iloc[-1]
-        info = stock.info
-        prev_close = info.get('previousClose', latest_price)
+        latest_price, prev_close = quote
         price_change = ((latest_price - prev_close) / prev_close) * 100
         
         return jsonify({
             'symbol': symbol,
             'current_price': round(latest_price, 2),
             'change_percent': round(price_change, 2),
-            'company_name': info.get('longName', symbol),
-            'timestamp': datetime.now().isoformat()
+            'company_name': get_stock_info(symbol)['name'],
+            'timestamp': datetime.now()
         })
     except Exception as e:
         return jsonify({'error': f'Error fetching stock data: {str(e)}'}), 500
@@ -92,23 +164,28 @@ def add_to_portfolio(current_user):
         except ValueError:
             return jsonify({'error': 'Invalid quantity'}), 400
             
+        db = get_db()
         portfolio_ref = db.collection('portfolios').document(current_user)
+        increment = {
+            f'stocks.{symbol}': firestore.Increment(quantity),
+            'updated_at': firestore.SERVER_TIMESTAMP
+        }
         
-        portfolio = portfolio_ref.get()
-        if portfolio.exists:
-            current_stocks = portfolio.to_dict().get('stocks', {})
-            current_stocks[symbol] = current_stocks.get(symbol, 0) + quantity
-            portfolio_ref.update({
-                'stocks': current_stocks,
-                'updated_at': firestore.SERVER_TIMESTAMP
-            })
-        else:
-            portfolio_ref.set({
-                'stocks': {symbol: quantity},
-                'user_id': current_user,
-                'created_at': firestore.SERVER_TIMESTAMP,
-                'updated_at': firestore.SERVER_TIMESTAMP
-            })
+        # Atomically increment the position in a single write; only fall back
+        # to creating the portfolio when the document does not exist yet
+        try:
+            portfolio_ref.update(increment)
+        except NotFound:
+            try:
+                portfolio_ref.create({
+                    'stocks': {symbol: quantity},
+                    'user_id': current_user,
+                    'created_at': firestore.SERVER_TIMESTAMP,
+                    'updated_at': firestore.SERVER_TIMESTAMP
+                })
+            except AlreadyExists:
+                # Created concurrently by another request
+                portfolio_ref.update(increment)
             
         return jsonify({
             'message': 'Stock added to portfolio successfully',
@@ -123,6 +200,7 @@ def add_to_portfolio(current_user):
 def get_portfolio(current_user):
     """Get user's portfolio with current prices"""
     try:
+        db = get_db()
         portfolio_ref = db.collection('portfolios').document(current_user)
         portfolio = portfolio_ref.get()
         
@@ -138,25 +216,15 @@ def get_portfolio(current_user):
         detailed_portfolio = []
         total_value = 0
         
-        for symbol, quantity in stocks.items():
-            stock = yf.Ticker(symbol)
-            current_price = stock.history(period='1d')['Close'].iloc[-1]
-            stock_value = current_price * quantity
+        for holding, stock_value in _executor.map(_fetch_holding, stocks.keys(), stocks.values()):
             total_value += stock_value
-            
-            detailed_portfolio.append({
-                'symbol': symbol,
-                'quantity': quantity,
-                'current_price': round(current_price, 2),
-                'total_value': round(stock_value, 2),
-                'company_name': stock.info.get('longName', symbol)
-            })
+            detailed_portfolio.append(holding)
         
         return jsonify({
             'portfolio': detailed_portfolio,
             'total_value': round(total_value, 2),
             'stock_count': len(detailed_portfolio),
-            'last_updated': datetime.now().isoformat()
+            'last_updated': datetime.now()
         })
     except Exception as e:
         return jsonify({'error': f'Error fetching portfolio: {str(e)}'}), 500
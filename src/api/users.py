@@ -1,11 +1,16 @@
 # src/api/users.py
+import itertools
+
 from firebase_admin import auth, firestore
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, current_app, jsonify, request, stream_with_context
 
-from utils.validators import admin_required, token_required, validate_user_data
+from services.firebase_service import get_db, set_role_claims
+from services.users_service import PageArgumentError
+from utils.json_provider import dump_json
+from utils.validators import (admin_required, get_cached_user, invalidate_cached_user,
+                              token_required, validate_user_data)
 
 bp = Blueprint('users', __name__)
-db = firestore.client()
 
 @bp.route('/<user_id>', methods=['GET'])
 @token_required
@@ -15,17 +20,18 @@ def get_user(current_user, user_id):
         # Check if user is requesting their own data or is admin
         if current_user != user_id:
             try:
-                user = auth.get_user(current_user)
+                user = get_cached_user(current_user)
                 custom_claims = user.custom_claims or {}
                 if not custom_claims.get('admin', False):
                     return jsonify({'error': 'Unauthorized access'}), 403
             except Exception as e:
                 return jsonify({'error': 'Error verifying permissions'}), 500
         
-        # Get Firebase auth user
-        user = auth.get_user(user_id)
+        # Get Firebase auth user, reusing the record the decorator looked up
+        user = get_cached_user(user_id)
         
         # Get additional user data from Firestore
+        db = get_db()
         user_doc = db.collection('users').document(user_id).get()
         user_data = user_doc.to_dict() if user_doc.exists else {}
         
@@ -48,18 +54,19 @@ def get_user(current_user, user_id):
 def update_user(current_user, user_id):
     """Update user profile"""
     try:
-        # Check if user is updating their own data or is admin
-        if current_user != user_id:
+        data = request.get_json()
+        
+        # Check if user is updating their own data or is admin; roles grant
+        # access, so only admins may change them
+        if current_user != user_id or 'role' in (data or {}):
             try:
-                user = auth.get_user(current_user)
+                user = get_cached_user(current_user)
                 custom_claims = user.custom_claims or {}
                 if not custom_claims.get('admin', False):
                     return jsonify({'error': 'Unauthorized access'}), 403
             except Exception as e:
                 return jsonify({'error': 'Error verifying permissions'}), 500
         
-        data = request.get_json()
-        
         # Validate user data
         error = validate_user_data(data)
         if error:
@@ -73,8 +80,10 @@ def update_user(current_user, user_id):
             update_args['email'] = data['email']
         if update_args:
             auth.update_user(user_id, **update_args)
+            invalidate_cached_user(user_id)
         
         # Update additional user data in Firestore
+        db = get_db()
         user_ref = db.collection('users').document(user_id)
         profile_data = {
             k: v for k, v in data.items() 
@@ -83,6 +92,11 @@ def update_user(current_user, user_id):
         if profile_data:
             profile_data['updated_at'] = firestore.SERVER_TIMESTAMP
             user_ref.set(profile_data, merge=True)
+            invalidate_cached_user(user_id)
+        
+        # Mirror role changes into the Auth claims that tokens carry
+        if 'role' in profile_data:
+            set_role_claims(auth.get_user(user_id), profile_data['role'])
         
         return jsonify({
             'message': 'User updated successfully',
@@ -100,12 +114,15 @@ def delete_user(current_user, user_id):
     try:
         # Delete from Firebase Auth
         auth.delete_user(user_id)
+        invalidate_cached_user(user_id)
         
-        # Delete from Firestore
-        db.collection('users').document(user_id).delete()
-        
-        # Delete user's portfolio
-        db.collection('portfolios').document(user_id).delete()
+        # Delete profile and portfolios from Firestore in a single atomic batch
+        db = get_db()
+        batch = db.batch()
+        batch.delete(db.collection('users').document(user_id))
+        batch.delete(db.collection('portfolios').document(user_id))
+        batch.delete(db.collection('crypto_portfolios').document(user_id))
+        batch.commit()
         
         return jsonify({
             'message': 'User and associated data deleted successfully',
@@ -116,32 +133,65 @@ def delete_user(current_user, user_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def _listing_entry(user, profile):
+    """Admin listing entry for an Auth user record and its Firestore profile"""
+    return {
+        'uid': user.uid,
+        'email': user.email,
+        'display_name': user.display_name,
+        'email_verified': user.email_verified,
+        'disabled': user.disabled,
+        'created_at': user.user_metadata.creation_timestamp,
+        'profile_data': profile
+    }
+
 @bp.route('/admin/all', methods=['GET'])
 @admin_required
 def get_all_users(current_user):
-    """Get all users (admin only)"""
+    """
+    Get all users (admin only)
+    The JSON body is streamed as each page of users is read, so memory stays
+    bounded by one page however many users exist. It ends with "complete": true;
+    if a later page fails the list is cut short and ends with "complete": false
+    and an "error" message instead
+    Pass ?page_size=N (and ?page_token= from a previous next_cursor) to get a
+    single page instead
+    """
+    single_page = bool(request.args.get('page_size'))
+    pages = bp.services['users'].iter_user_pages(
+        page_size=request.args.get('page_size'),
+        page_token=request.args.get('page_token')
+    )
+    
     try:
-        users_list = []
-        page = auth.list_users()
-        
-        for user in page.users:
-            # Get additional user data from Firestore
-            user_doc = db.collection('users').document(user.uid).get()
-            user_data = user_doc.to_dict() if user_doc.exists else {}
-            
-            users_list.append({
-                'uid': user.uid,
-                'email': user.email,
-                'display_name': user.display_name,
-                'email_verified': user.email_verified,
-                'disabled': user.disabled,
-                'created_at': user.user_metadata.creation_timestamp,
-                'profile_data': user_data
-            })
-        
-        return jsonify({
-            'users': users_list,
-            'count': len(users_list)
-        })
+        # Fetch the first page up front so bad arguments and early failures
+        # still get an error response
+        first_page = next(pages)
+    except PageArgumentError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
\ No newline at end of file
+        return jsonify({'error': str(e)}), 500
+    
+    def generate():
+        yield b'{"users":['
+        count = 0
+        next_cursor = None
+        error = None
+        try:
+            for users, next_cursor in itertools.chain([first_page], pages):
+                for user, profile in users:
+                    yield (b',' if count else b'') + dump_json(_listing_entry(user, profile))
+                    count += 1
+        except Exception as e:
+            # The 200 status is already sent, so report the failure in the body
+            current_app.logger.error(f"Error streaming users: {str(e)}")
+            error = str(e)
+        yield b'],"count":' + str(count).encode()
+        if error is None:
+            if single_page:
+                yield b',"next_cursor":' + dump_json(next_cursor)
+            yield b',"complete":true}'
+        else:
+            yield b',"complete":false,"error":' + dump_json(error) + b'}'
+    
+    return current_app.response_class(stream_with_context(generate()), mimetype='application/json')
@@ -1,8 +1,9 @@
+import importlib
 import logging
 import os
+import threading
 from datetime import datetime
 from logging.handlers import RotatingFileHandler
-from pathlib import Path
 
 from flask import Flask, jsonify, request
 from flask_cors import CORS
@@ -10,9 +11,10 @@ from werkzeug.middleware.proxy_fix import ProxyFix
 
 from config.config import get_config
 from services.auth_service import AuthService
-from services.firebase_service import FirebaseService
+from services.firebase_service import FirebaseService, warm_db
 from services.stocks_service import StocksService
 from services.users_service import UsersService
+from utils.json_provider import OrjsonProvider
 from utils.validators import token_required
 
 
@@ -20,8 +22,9 @@ def setup_logging(app, config):
     """Configure logging"""
     if not app.debug:
         # Ensure log directory exists
-        log_dir = Path(app.root_path) / 'logs'
-        log_dir.mkdir(exist_ok=True)
+        log_dir = os.path.dirname(config.LOG_FILE)
+        if log_dir:
+            os.makedirs(log_dir, exist_ok=True)
         
         # Create file handler
         file_handler = RotatingFileHandler(
@@ -103,42 +106,66 @@ def register_error_handlers(app):
             'status_code': 500
         }), 500
 
+# Blueprint modules and the URL prefixes they are mounted at under API_PREFIX
+_BLUEPRINTS = (
+    ('api.auth', '/auth'),
+    ('api.stocks', '/stocks'),
+    ('api.users', '/users')
+)
+
 def register_blueprints(app, services):
     """Register Flask blueprints"""
     try:
-        from api.auth import bp as auth_bp
-        from api.stocks import bp as stocks_bp
-        from api.users import bp as users_bp
-
-        # Pass services to blueprints
-        auth_bp.services = services
-        stocks_bp.services = services
-        users_bp.services = services
-        
         # Register blueprints with versioning
         api_prefix = app.config['API_PREFIX']
-        blueprints = [
-            (auth_bp, '/auth'),
-            (stocks_bp, '/stocks'),
-            (users_bp, '/users')
-        ]
         
-        for blueprint, prefix in blueprints:
+        for module_name, prefix in _BLUEPRINTS:
+            blueprint = importlib.import_module(module_name).bp
+            
+            # Pass services to blueprints
+            blueprint.services = services
+            
             app.register_blueprint(blueprint, url_prefix=f"{api_prefix}{prefix}")
-            app.logger.info(f"Registered blueprint: {blueprint.name} at {api_prefix}{prefix}")
+            app.logger.info("Registered blueprint: %s at %s%s", blueprint.name, api_prefix, prefix)
     
     except Exception as e:
-        app.logger.error(f"Error registering blueprints: {str(e)}")
+        app.logger.error("Error registering blueprints: %s", e)
         raise
 
+def start_warmup(app):
+    """
+    Prefetch static data and open connections in the background
+    Run by the server entry points rather than create_app, so building the
+    app makes no network calls. Returns the warmup thread, or None when
+    WARMUP_ON_STARTUP is off
+    """
+    if not app.config['WARMUP_ON_STARTUP']:
+        return None
+    warm_firestore = app.config['WARMUP_FIRESTORE'] and app.extensions['firebase'].initialized
+    
+    def warmup():
+        try:
+            if warm_firestore:
+                warm_db()
+            from api.stocks import get_all_stock_info
+            get_all_stock_info()
+            app.logger.info("Warmup complete")
+        except Exception as e:
+            app.logger.warning("Warmup failed: %s", e)
+
+    thread = threading.Thread(target=warmup, name='warmup', daemon=True)
+    thread.start()
+    return thread
+
 def create_app(config_class=None):
     """Application factory function"""
     # Initialize Flask app
     app = Flask(__name__)
+    app.json = OrjsonProvider(app)
     
     # Load configuration
     config = config_class or get_config()
-    app.config.from_object(config)
+    config.init_app(app)
     
     # Setup logging
     setup_logging(app, config)
@@ -147,21 +174,20 @@ def create_app(config_class=None):
     CORS(app, resources={r"/api/*": {"origins": config.CORS_ORIGINS}})
     app.wsgi_app = ProxyFix(app.wsgi_app)
     
-    # Initialize services
-    services = {
-        'firebase': FirebaseService(),
-        'auth': AuthService(),
-        'stocks': StocksService(),
-        'users': UsersService()
-    }
-    
     # Initialize Firebase
-    firebase_initialized = services['firebase'].init_app(app, config)
+    firebase_service = FirebaseService()
+    firebase_initialized = firebase_service.init_app(app, config)
     if not firebase_initialized:
         app.logger.error("Failed to initialize Firebase")
+    app.extensions['firebase'] = firebase_service
     
-    # Pass config to services that need it
-    services['auth'].config = config
+    # Initialize services, sharing the Firebase service and its Firestore client pool
+    services = {
+        'firebase': firebase_service,
+        'auth': AuthService(firebase_service, config),
+        'stocks': StocksService(firebase_service),
+        'users': UsersService(firebase_service)
+    }
     
     # Register error handlers
     register_error_handlers(app)
@@ -194,7 +220,7 @@ def create_app(config_class=None):
             'environment': app.config['FLASK_ENV'],
             'firebase_status': 'connected' if firebase_initialized else 'disconnected',
             'database_status': 'connected',  # Add actual DB check if needed
-            'timestamp': datetime.utcnow().isoformat(),
+            'timestamp': datetime.utcnow(),
             'uptime': 'unknown'  # Add actual uptime tracking if needed
         })
     
@@ -209,11 +235,13 @@ def create_app(config_class=None):
     
     return app
 
-# Create the application instance
-app = create_app()
-
+# Development server only; run gunicorn -c gunicorn.conf.py in production
 if __name__ == "__main__":
     config = get_config()
+    app = create_app(config)
+    
+    # Warm the stock metadata cache and Firestore channel off the request path
+    start_warmup(app)
     
     # Print available routes when starting the server
     print("\nAvailable routes:")
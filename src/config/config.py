@@ -1,20 +1,34 @@
+import functools
 import os
 from datetime import timedelta
 
 from dotenv import load_dotenv
 
+_DOTENV_LOADED = False
+
+def _load_dotenv_once():
+    """
+    Load the .env file on first use only
+    Set DOTENV_PATH to load a specific file instead of searching upwards from the cwd
+    """
+    global _DOTENV_LOADED
+    if not _DOTENV_LOADED:
+        load_dotenv(os.getenv('DOTENV_PATH'))
+        _DOTENV_LOADED = True
+
 
 class Config:
     """Application configuration class"""
     def __init__(self):
         # Load environment variables from .env file
-        load_dotenv()
+        _load_dotenv_once()
+        env = os.environ
 
         # Flask Configuration
-        self.SECRET_KEY = os.getenv('SECRET_KEY', os.urandom(24).hex())
-        self.DEBUG = os.getenv('FLASK_DEBUG', 'False').lower() == 'true'
-        self.HOST = os.getenv('FLASK_HOST', '127.0.0.1')
-        self.PORT = int(os.getenv('FLASK_PORT', 5000))
+        self.SECRET_KEY = env.get('SECRET_KEY') or os.urandom(24).hex()
+        self.DEBUG = env.get('FLASK_DEBUG', 'False').lower() == 'true'
+        self.HOST = env.get('FLASK_HOST', '127.0.0.1')
+        self.PORT = int(env.get('FLASK_PORT', 5000))
         
         # API Configuration
         self.API_VERSION = '1.0'
@@ -22,61 +36,65 @@ class Config:
         self.API_PREFIX = '/api/v1'
         
         # CORS Configuration
-        self.CORS_ORIGINS = os.getenv('CORS_ORIGINS', '*').split(',')
+        self.CORS_ORIGINS = env.get('CORS_ORIGINS', '*').split(',')
         
         # JWT Configuration
-        self.JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'your-jwt-secret-key')
+        self.JWT_SECRET_KEY = env.get('JWT_SECRET_KEY', 'your-jwt-secret-key')
         self.JWT_ACCESS_TOKEN_EXPIRES = timedelta(
-            seconds=int(os.getenv('JWT_ACCESS_TOKEN_EXPIRES', 3600))
+            seconds=int(env.get('JWT_ACCESS_TOKEN_EXPIRES', 3600))
         )  # Default 1 hour
         self.JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=30)  # 30 days
         self.JWT_ALGORITHM = 'HS256'
         
         # Firebase Configuration
-        self.FIREBASE_CREDS_PATH = os.getenv(
+        self.FIREBASE_CREDS_PATH = env.get(
             'FIREBASE_CREDS_PATH', 
             os.path.join('credentials', 'firebase_credentials.json')
         )
         
         # Database Configuration
-        self.SQLALCHEMY_DATABASE_URI = os.getenv(
+        self.SQLALCHEMY_DATABASE_URI = env.get(
             'DATABASE_URL',
             'sqlite:///app.db'
         )
         self.SQLALCHEMY_TRACK_MODIFICATIONS = False
         
         # File Upload Configuration
-        self.UPLOAD_FOLDER = os.getenv('UPLOAD_FOLDER', 'uploads')
+        self.UPLOAD_FOLDER = env.get('UPLOAD_FOLDER', 'uploads')
         self.MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
         self.ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'pdf'}
         
         # Security Configuration
         self.BCRYPT_LOG_ROUNDS = 13
-        self.PASSWORD_SALT = os.getenv('PASSWORD_SALT', 'your-password-salt')
+        self.PASSWORD_SALT = env.get('PASSWORD_SALT', 'your-password-salt')
         
         # Email Configuration
-        self.MAIL_SERVER = os.getenv('MAIL_SERVER', 'smtp.gmail.com')
-        self.MAIL_PORT = int(os.getenv('MAIL_PORT', 587))
-        self.MAIL_USE_TLS = os.getenv('MAIL_USE_TLS', 'True').lower() == 'true'
-        self.MAIL_USERNAME = os.getenv('MAIL_USERNAME')
-        self.MAIL_PASSWORD = os.getenv('MAIL_PASSWORD')
-        self.MAIL_DEFAULT_SENDER = os.getenv(
+        self.MAIL_SERVER = env.get('MAIL_SERVER', 'smtp.gmail.com')
+        self.MAIL_PORT = int(env.get('MAIL_PORT', 587))
+        self.MAIL_USE_TLS = env.get('MAIL_USE_TLS', 'True').lower() == 'true'
+        self.MAIL_USERNAME = env.get('MAIL_USERNAME')
+        self.MAIL_PASSWORD = env.get('MAIL_PASSWORD')
+        self.MAIL_DEFAULT_SENDER = env.get(
             'MAIL_DEFAULT_SENDER',
             'noreply@actapp.com'
         )
         
         # Cache Configuration
-        self.CACHE_TYPE = os.getenv('CACHE_TYPE', 'simple')
-        self.CACHE_DEFAULT_TIMEOUT = int(os.getenv('CACHE_DEFAULT_TIMEOUT', 300))
+        self.CACHE_TYPE = env.get('CACHE_TYPE', 'simple')
+        self.CACHE_DEFAULT_TIMEOUT = int(env.get('CACHE_DEFAULT_TIMEOUT', 300))
         
         # Session Configuration
         self.SESSION_TYPE = 'filesystem'
         self.PERMANENT_SESSION_LIFETIME = timedelta(days=31)
         
         # Logging Configuration
-        self.LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+        self.LOG_LEVEL = env.get('LOG_LEVEL', 'INFO')
         self.LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-        self.LOG_FILE = os.getenv('LOG_FILE', 'logs/app.log')
+        self.LOG_FILE = env.get('LOG_FILE', 'logs/app.log')
+        
+        # Startup Configuration
+        self.WARMUP_ON_STARTUP = env.get('WARMUP_ON_STARTUP', 'True').lower() == 'true'
+        self.WARMUP_FIRESTORE = env.get('WARMUP_FIRESTORE', 'True').lower() == 'true'
         
         # API Rate Limiting
         self.RATELIMIT_DEFAULT = "200 per day;50 per hour;1 per second"
@@ -91,15 +109,12 @@ class Config:
             
     def init_app(self, app):
         """Initialize application configuration"""
-        # Ensure upload folder exists
-        os.makedirs(self.UPLOAD_FOLDER, exist_ok=True)
-        
-        # Ensure logs directory exists
-        os.makedirs(os.path.dirname(self.LOG_FILE), exist_ok=True)
-        
-        # Set Flask configuration from this config object
-        for key in [a for a in dir(self) if not a.startswith('_') and a.isupper()]:
-            app.config[key] = getattr(self, key)
+        # Set Flask configuration from this config object; settings are all
+        # instance attributes, so read them straight from the instance dict
+        app.config.update({
+            key: value for key, value in vars(self).items()
+            if key.isupper() and not key.startswith('_')
+        })
 
 class DevelopmentConfig(Config):
     """Development configuration"""
@@ -127,6 +142,7 @@ class TestingConfig(Config):
         self.DEBUG = True
         self.SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
         self.WTF_CSRF_ENABLED = False
+        self.WARMUP_ON_STARTUP = False
 
 # Configuration dictionary
 config = {
@@ -136,7 +152,12 @@ config = {
     'default': DevelopmentConfig
 }
 
+@functools.lru_cache(maxsize=None)
 def get_config():
-    """Get configuration based on environment"""
+    """
+    Get configuration based on environment
+    The instance is built once per process and shared; call get_config.cache_clear()
+    after changing FLASK_ENV or other settings at runtime (e.g. in tests)
+    """
     env = os.getenv('FLASK_ENV', 'default')
     return config.get(env, config['default'])()
\ No newline at end of file
@@ -1,7 +1,25 @@
 # src/services/__init__.py
-from .auth_service import AuthService
-from .firebase_service import FirebaseService
-from .stocks_service import StocksService
-from .users_service import UsersService
+import importlib
+
+# Services are imported on first access so that importing one submodule
+# (e.g. services.firebase_service) doesn't pull in all the others
+_SERVICES = {
+    'AuthService': '.auth_service',
+    'FirebaseService': '.firebase_service',
+    'StocksService': '.stocks_service',
+    'UsersService': '.users_service',
+}
 
 __all__ = ['AuthService', 'StocksService', 'UsersService', 'FirebaseService']
+
+
+def __getattr__(name):
+    if name not in _SERVICES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    service = getattr(importlib.import_module(_SERVICES[name], __name__), name)
+    globals()[name] = service
+    return service
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -1,12 +1,28 @@
 # src/services/auth_service.py
-from datetime import datetime, timedelta
+import base64
+import hashlib
+import hmac
+import time
+from datetime import timedelta
 from typing import Dict, Optional, Tuple
 
-import jwt
+import orjson
 from firebase_admin import auth
 from flask import current_app
 
 
+def _b64encode(data: bytes) -> bytes:
+    """Base64url-encode without padding, as used by JWT"""
+    return base64.urlsafe_b64encode(data).rstrip(b'=')
+
+def _b64decode(data: bytes) -> bytes:
+    """Decode unpadded base64url"""
+    return base64.urlsafe_b64decode(data + b'=' * (-len(data) % 4))
+
+# Every token we issue uses the same header, so encode it once
+_JWT_HEADER = _b64encode(orjson.dumps({'alg': 'HS256', 'typ': 'JWT'}))
+
+
 class AuthService:
     """Service for handling authentication operations"""
     
@@ -14,20 +30,40 @@ class AuthService:
         """Initialize auth service"""
         self.firebase_service = firebase_service
         self.config = config
+    
+    @property
+    def config(self):
+        return self._config
+    
+    @config.setter
+    def config(self, config):
+        """Set config and cache the signing key and token lifetime derived from it"""
+        self._config = config
+        self._key = config.JWT_SECRET_KEY.encode() if config else None
+        if config:
+            expires = config.JWT_ACCESS_TOKEN_EXPIRES
+            self._ttl_seconds = int(
+                expires.total_seconds() if isinstance(expires, timedelta) else expires
+            )
+        else:
+            self._ttl_seconds = None
+    
+    def _sign(self, signing_input: bytes) -> bytes:
+        """HMAC-SHA256 signature of the JWT signing input"""
+        return hmac.new(self._key, signing_input, hashlib.sha256).digest()
         
     def generate_token(self, user_id: str) -> Optional[str]:
         """Generate JWT token"""
         try:
+            now = int(time.time())
             payload = {
-                'exp': datetime.utcnow() + timedelta(seconds=self.config.JWT_ACCESS_TOKEN_EXPIRES),
-                'iat': datetime.utcnow(),
+                'exp': now + self._ttl_seconds,
+                'iat': now,
                 'sub': user_id
             }
-            return jwt.encode(
-                payload,
-                self.config.JWT_SECRET_KEY,
-                algorithm='HS256'
-            )
+            
+            signing_input = _JWT_HEADER + b'.' + _b64encode(orjson.dumps(payload))
+            return (signing_input + b'.' + _b64encode(self._sign(signing_input))).decode()
         except Exception as e:
             current_app.logger.error(f"Error generating token: {str(e)}")
             return None
@@ -151,13 +187,23 @@ class AuthService:
     def verify_token(self, token: str) -> Tuple[Optional[str], Optional[str]]:
         """Verify JWT token"""
         try:
-            payload = jwt.decode(
-                token,
-                self.config.JWT_SECRET_KEY,
-                algorithms=['HS256']
-            )
+            header_b64, payload_b64, signature_b64 = token.encode().split(b'.')
+            
+            # Compare the encoded signature: the base64 decoder skips invalid
+            # characters, so altered or padded signatures could decode to a
+            # valid one
+            expected = _b64encode(self._sign(header_b64 + b'.' + payload_b64))
+            if not hmac.compare_digest(expected, signature_b64):
+                return None, 'Invalid token'
+            
+            header = orjson.loads(_b64decode(header_b64))
+            if header.get('alg') != 'HS256':
+                return None, 'Invalid token'
+            
+            payload = orjson.loads(_b64decode(payload_b64))
+            if 'exp' in payload and payload['exp'] <= time.time():
+                return None, 'Token has expired'
+            
             return payload['sub'], None
-        except jwt.ExpiredSignatureError:
-            return None, 'Token has expired'
-        except jwt.InvalidTokenError:
+        except (ValueError, TypeError, KeyError, AttributeError):
             return None, 'Invalid token'
\ No newline at end of file
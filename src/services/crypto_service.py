@@ -5,35 +5,170 @@ from typing import Dict, List, Optional
 
 import requests
 from firebase_admin import firestore
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from services.firebase_service import get_db
+from utils.cache import TTLCache
+
+# CoinGecko ids for each supported symbol
+COINGECKO_IDS = {'BTC': 'bitcoin', 'ETH': 'ethereum', 'USDT': 'tether'}
+
+# Shared HTTP session so connections to CoinGecko are kept alive between calls;
+# sized for every request thread plus the crypto blueprint's executor
+COINGECKO_TIMEOUT = (1, 3)  # (connect, read) seconds
+_SESSION = requests.Session()
+_SESSION.mount('https://', HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=32,
+    max_retries=Retry(total=3, backoff_factor=0.2)
+))
+
+# Recently fetched prices, keyed by symbol; shared by every service instance
+# and the crypto blueprint
+PRICE_CACHE_TTL = 15  # seconds
+_PRICE_CACHE = TTLCache(ttl=PRICE_CACHE_TTL, maxsize=64)
+
+
+def get_crypto_prices(symbols: List[str]) -> Dict[str, float]:
+    """
+    Get current prices for several cryptocurrencies in a single CoinGecko request
+    Prices are cached for PRICE_CACHE_TTL seconds; only missing symbols are fetched
+    """
+    prices = {}
+    coin_ids = {}
+    
+    try:
+        for symbol in symbols:
+            cached_price = _PRICE_CACHE.get(symbol)
+            if cached_price is not None:
+                prices[symbol] = cached_price
+                continue
+            
+            coin_id = COINGECKO_IDS.get(symbol)
+            if not coin_id:
+                raise ValueError(f"Unsupported cryptocurrency: {symbol}")
+            coin_ids[symbol] = coin_id
+        
+        if coin_ids:
+            url = ("https://api.coingecko.com/api/v3/simple/price"
+                   f"?ids={','.join(coin_ids.values())}&vs_currencies=usd")
+            response = _SESSION.get(url, timeout=COINGECKO_TIMEOUT)
+            data = response.json()
+            
+            for symbol, coin_id in coin_ids.items():
+                prices[symbol] = data[coin_id]['usd']
+                _PRICE_CACHE.set(symbol, prices[symbol])
+        
+        return prices
+    except Exception as e:
+        raise Exception(f"Error fetching crypto price: {str(e)}")
+
+
+@firestore.transactional
+def apply_purchase(transaction, portfolio_ref, user_id, symbol, quantity, current_price):
+    """
+    Add a purchase to a crypto portfolio inside a transaction
+    Only the purchased symbol's position is read and written, however many
+    assets the portfolio holds; Firestore retries on concurrent changes.
+    Shared by CryptoService and the crypto blueprint
+    """
+    position_path = f'assets.{symbol}'
+    portfolio = portfolio_ref.get(field_paths=[position_path], transaction=transaction)
+    now_iso = datetime.now().isoformat()
+    
+    if not portfolio.exists:
+        transaction.set(portfolio_ref, {
+            'user_id': user_id,
+            'assets': {
+                symbol: {
+                    'quantity': quantity,
+                    'avg_price': current_price,
+                    'last_updated': now_iso
+                }
+            },
+            'created_at': firestore.SERVER_TIMESTAMP,
+            'updated_at': firestore.SERVER_TIMESTAMP
+        })
+        return
+    
+    position = portfolio.to_dict().get('assets', {}).get(symbol)
+    if position:
+        old_quantity = position['quantity']
+        old_value = position['avg_price'] * old_quantity
+        new_value = current_price * quantity
+        total_quantity = old_quantity + quantity
+        avg_price = (old_value + new_value) / total_quantity
+    else:
+        total_quantity = quantity
+        avg_price = current_price
+    
+    transaction.update(portfolio_ref, {
+        position_path: {
+            'quantity': total_quantity,
+            'avg_price': avg_price,
+            'last_updated': now_iso
+        },
+        'updated_at': firestore.SERVER_TIMESTAMP
+    })
 
 
 class CryptoService:
-    def __init__(self):
-        self.db = firestore.client()
+    def __init__(self, db=None):
+        """Initialize crypto service with an existing Firestore client if provided"""
+        self._db = db
         self.supported_cryptos = {
             'BTC': 'Bitcoin',
             'ETH': 'Ethereum',
             'USDT': 'Tether'
         }
+    
+    @property
+    def db(self):
+        """The client given at construction, else the calling thread's pooled client"""
+        return self._db if self._db is not None else get_db()
+        
+    def get_prices(self, symbols: List[str]) -> Dict[str, float]:
+        """Get current prices for several cryptocurrencies in one request"""
+        return get_crypto_prices(symbols)
         
     def get_price(self, symbol: str) -> float:
         """Get current price for a cryptocurrency"""
-        symbol_mapping = {'BTC': 'bitcoin', 'ETH': 'ethereum', 'USDT': 'tether'}
-        coin_id = symbol_mapping.get(symbol)
-        
-        if not coin_id:
-            raise ValueError(f"Unsupported cryptocurrency: {symbol}")
-            
-        url = f"https://api.coingecko.com/api/v3/simple/price?ids={coin_id}&vs_currencies=usd"
-        response = requests.get(url)
-        data = response.json()
-        return data[coin_id]['usd']
+        return self.get_prices([symbol])[symbol]
         
     def get_portfolio(self, user_id: str) -> Dict:
         """Get user's cryptocurrency portfolio"""
         portfolio_ref = self.db.collection('crypto_portfolios').document(user_id)
         portfolio = portfolio_ref.get()
         
+        if not portfolio.exists:
+            return self._build_portfolio(portfolio, {})
+        
+        assets = portfolio.to_dict().get('assets', {})
+        return self._build_portfolio(portfolio, self.get_prices(list(assets)))
+        
+    def get_portfolios(self, user_ids: List[str]) -> Dict[str, Dict]:
+        """
+        Get several users' cryptocurrency portfolios, keyed by user id
+        All portfolios are read in one Firestore round trip and priced with
+        one CoinGecko request, however many users are asked for
+        """
+        if not user_ids:
+            return {}
+        
+        collection = self.db.collection('crypto_portfolios')
+        snapshots = list(self.db.get_all([collection.document(uid) for uid in user_ids]))
+        
+        symbols = set()
+        for snapshot in snapshots:
+            if snapshot.exists:
+                symbols.update(snapshot.to_dict().get('assets', {}))
+        prices = self.get_prices(sorted(symbols)) if symbols else {}
+        
+        return {snapshot.id: self._build_portfolio(snapshot, prices) for snapshot in snapshots}
+        
+    def _build_portfolio(self, portfolio, prices: Dict[str, float]) -> Dict:
+        """Value a portfolio snapshot against already fetched prices"""
         if not portfolio.exists:
             return {
                 'assets': [],
@@ -47,7 +182,7 @@ class CryptoService:
         total_value = 0
         
         for symbol, data in assets.items():
-            current_price = self.get_price(symbol)
+            current_price = prices[symbol]
             quantity = data['quantity']
             avg_price = data['avg_price']
             current_value = quantity * current_price
@@ -68,7 +203,7 @@ class CryptoService:
             'portfolio': current_portfolio,
             'total_value': total_value,
             'asset_count': len(current_portfolio),
-            'last_updated': datetime.now().isoformat()
+            'last_updated': datetime.now()
         }
         
     def add_to_portfolio(self, user_id: str, symbol: str, quantity: float) -> Dict:
@@ -81,48 +216,8 @@ class CryptoService:
             
         current_price = self.get_price(symbol)
         portfolio_ref = self.db.collection('crypto_portfolios').document(user_id)
-        portfolio = portfolio_ref.get()
-        
-        if portfolio.exists:
-            portfolio_data = portfolio.to_dict()
-            assets = portfolio_data.get('assets', {})
-            
-            if symbol in assets:
-                old_quantity = assets[symbol]['quantity']
-                old_value = assets[symbol]['avg_price'] * old_quantity
-                new_value = current_price * quantity
-                total_quantity = old_quantity + quantity
-                avg_price = (old_value + new_value) / total_quantity
-                
-                assets[symbol] = {
-                    'quantity': total_quantity,
-                    'avg_price': avg_price,
-                    'last_updated': datetime.now().isoformat()
-                }
-            else:
-                assets[symbol] = {
-                    'quantity': quantity,
-                    'avg_price': current_price,
-                    'last_updated': datetime.now().isoformat()
-                }
-            
-            portfolio_ref.update({
-                'assets': assets,
-                'updated_at': firestore.SERVER_TIMESTAMP
-            })
-        else:
-            portfolio_ref.set({
-                'user_id': user_id,
-                'assets': {
-                    symbol: {
-                        'quantity': quantity,
-                        'avg_price': current_price,
-                        'last_updated': datetime.now().isoformat()
-                    }
-                },
-                'created_at': firestore.SERVER_TIMESTAMP,
-                'updated_at': firestore.SERVER_TIMESTAMP
-            })
+        apply_purchase(self.db.transaction(), portfolio_ref, user_id,
+                       symbol, quantity, current_price)
             
         return {
             'symbol': symbol,
@@ -1,9 +1,111 @@
 # src/services/firebase_service.py
+import functools
+import itertools
 import os
+import threading
 from pathlib import Path
 
 import firebase_admin
 from firebase_admin import auth, credentials, firestore
+from flask import current_app
+from google.cloud import firestore as cloud_firestore
+
+from utils.validators import invalidate_cached_user
+
+# Each Firestore client owns its own gRPC channel, which caps the number of
+# concurrent streams; spreading threads over several clients avoids queueing
+# behind a single channel under load
+FIRESTORE_POOL_SIZE = max(1, int(os.getenv('FIRESTORE_POOL_SIZE', 4)))
+
+_db_pool = []
+_db_pool_lock = threading.Lock()
+_db_slots = itertools.count()
+_db_local = threading.local()
+
+def _create_db_pool():
+    """Create FIRESTORE_POOL_SIZE clients for the default Firebase app"""
+    app = firebase_admin.get_app()
+    pool = [firestore.client(app)]
+    for _ in range(FIRESTORE_POOL_SIZE - 1):
+        pool.append(cloud_firestore.Client(
+            project=app.project_id,
+            credentials=app.credential.get_credential()
+        ))
+    return pool
+
+def reset_db_pool():
+    """
+    Discard Firestore clients inherited from a parent process
+    gRPC channels are not fork-safe, so pre-forking servers must call this in
+    each worker after fork; clients are then recreated lazily by get_db()
+    """
+    global _db_pool_lock, _db_local
+    _db_pool_lock = threading.Lock()
+    _db_local = threading.local()
+    del _db_pool[:]
+
+def get_db():
+    """
+    Get the Firestore client assigned to the calling thread
+    Threads are assigned clients from the pool round-robin on first use
+    """
+    if not _db_pool:
+        with _db_pool_lock:
+            if not _db_pool:
+                _db_pool.extend(_create_db_pool())
+    slot = getattr(_db_local, 'slot', None)
+    if slot is None:
+        slot = _db_local.slot = next(_db_slots) % len(_db_pool)
+    return _db_pool[slot]
+
+def warm_db():
+    """
+    Connect every pooled Firestore client
+    Clients open their gRPC channel lazily on the first call, so each one reads
+    a single (missing) document
+    """
+    get_db()
+    for client in list(_db_pool):
+        client.collection('_warmup').document('ping').get()
+
+def set_role_claims(user, role: str) -> None:
+    """
+    Mirror a user's role into their Firebase Auth custom claims
+    admin_required reads the admin claim, and tokens issued afterwards carry
+    the role for clients
+    """
+    claims = dict(user.custom_claims or {})
+    claims.update(role=role, admin=(role == 'admin'))
+    auth.set_custom_user_claims(user.uid, claims)
+    invalidate_cached_user(user.uid)
+
+def firestore_endpoint(action: str):
+    """
+    Decorate a service method that returns (response_dict, status_code)
+    Checks the database connection before the call and turns any exception
+    into an error response
+    Args:
+        action: What the method does, for error messages (e.g. 'fetching stocks')
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(self, *args, **kwargs):
+            if not self.db:
+                current_app.logger.error("Database connection not initialized")
+                return {
+                    'message': 'Database connection error',
+                    'status': 'error'
+                }, 500
+            try:
+                return fn(self, *args, **kwargs)
+            except Exception as e:
+                current_app.logger.error(f"Error {action}: {str(e)}")
+                return {
+                    'message': f"Error {action}: {str(e)}",
+                    'status': 'error'
+                }, 500
+        return wrapper
+    return decorator
 
 
 class FirebaseService:
@@ -12,8 +114,17 @@ class FirebaseService:
     def __init__(self, app=None):
         """Initialize Firebase service"""
         self.app = app
-        self.db = None
+        self.initialized = False
         self.auth = None
+    
+    @property
+    def db(self):
+        """
+        Pooled Firestore client for the calling thread, or None before init_app
+        Resolved on every access, so clients discarded by reset_db_pool() after
+        a fork are never used again
+        """
+        return get_db() if self.initialized else None
         
     def init_app(self, app, config):
         """Initialize Firebase Admin SDK"""
@@ -28,13 +139,14 @@ class FirebaseService:
                 
                 cred = credentials.Certificate(str(cred_path))
                 firebase_admin.initialize_app(cred)
-                self.db = firestore.client()
-                
                 app.logger.info("Firebase initialized successfully!")
-                return True
             except Exception as e:
                 app.logger.error(f"Firebase initialization error: {str(e)}")
                 return False
+        
+        # Services read .db per call, so they share the blueprints' client pool
+        self.initialized = True
+        self.auth = auth
         return True
     
     def get_user_by_email(self, email):
@@ -70,6 +182,7 @@ class FirebaseService:
         """Delete a user"""
         try:
             auth.delete_user(uid)
+            invalidate_cached_user(uid)
             return True
         except Exception as e:
             self.app.logger.error(f"Error deleting user: {str(e)}")
@@ -79,6 +192,7 @@ class FirebaseService:
         """Update user properties"""
         try:
             auth.update_user(uid, **kwargs)
+            invalidate_cached_user(uid)
             return True
         except Exception as e:
             self.app.logger.error(f"Error updating user: {str(e)}")
@@ -88,6 +202,7 @@ class FirebaseService:
         """Disable a user account"""
         try:
             auth.update_user(uid, disabled=True)
+            invalidate_cached_user(uid)
             return True
         except Exception as e:
             self.app.logger.error(f"Error disabling user: {str(e)}")
@@ -97,6 +212,7 @@ class FirebaseService:
         """Enable a user account"""
         try:
             auth.update_user(uid, disabled=False)
+            invalidate_cached_user(uid)
             return True
         except Exception as e:
             self.app.logger.error(f"Error enabling user: {str(e)}")
@@ -106,6 +222,7 @@ class FirebaseService:
         """Set custom claims for a user"""
         try:
             auth.set_custom_user_claims(uid, claims)
+            invalidate_cached_user(uid)
             return True
         except Exception as e:
             self.app.logger.error(f"Error setting custom claims: {str(e)}")
@@ -1,9 +1,31 @@
 # src/services/stocks_service.py
+import copy
 from datetime import datetime
 from typing import Dict, List, Optional, Tuple, Union
 
 from firebase_admin import firestore
-from flask import current_app, jsonify
+from google.api_core.exceptions import AlreadyExists, NotFound
+
+from services.firebase_service import firestore_endpoint
+from utils.cache import TTLCache
+
+# Default page size for price history reads
+PRICE_HISTORY_LIMIT = 200
+
+# Successful stock read responses, cleared whenever this process writes a
+# stock; writes from other processes show up once entries expire
+STOCKS_CACHE_TTL = 30  # seconds
+_STOCKS_CACHE = TTLCache(ttl=STOCKS_CACHE_TTL, maxsize=1024)
+
+def _get_cached(key) -> Optional[Tuple[Dict, int]]:
+    """Copy of a cached (response, status) result, so callers can't alter the entry"""
+    cached = _STOCKS_CACHE.get(key)
+    return copy.deepcopy(cached) if cached is not None else None
+
+def _set_cached(key, result: Tuple[Dict, int]) -> Tuple[Dict, int]:
+    """Cache a copy of result and return the original"""
+    _STOCKS_CACHE.set(key, copy.deepcopy(result))
+    return result
 
 
 class StocksService:
@@ -12,42 +34,56 @@ class StocksService:
     def __init__(self, firebase_service=None):
         """Initialize stocks service"""
         self.firebase_service = firebase_service
-        self.db = firebase_service.db if firebase_service else None
+    
+    @property
+    def db(self):
+        """Firestore client for the calling thread, from the Firebase service's pool"""
+        return self.firebase_service.db if self.firebase_service else None
         
-    def get_all_stocks(self) -> Tuple[Dict, int]:
+    @firestore_endpoint('fetching stocks')
+    def get_all_stocks(self, fields: Optional[List[str]] = None, limit: Optional[int] = None,
+                       start_after: Optional[str] = None) -> Tuple[Dict, int]:
         """
         Get all stocks from the database
+        Args:
+            fields: Only return these fields (server-side projection)
+            limit: Maximum number of stocks to return, ordered by symbol
+            start_after: Symbol to continue after, from a previous next_cursor
         Returns: Tuple of (response_dict, status_code)
         """
-        try:
-            if not self.db:
-                current_app.logger.error("Database connection not initialized")
-                return {
-                    'message': 'Database connection error',
-                    'status': 'error'
-                }, 500
-            
-            stocks_ref = self.db.collection('stocks')
-            stocks = []
-            
-            for doc in stocks_ref.stream():
-                stock_data = doc.to_dict()
-                stock_data['id'] = doc.id
-                stocks.append(stock_data)
-            
-            return {
-                'stocks': stocks,
-                'count': len(stocks),
-                'status': 'success'
-            }, 200
-            
-        except Exception as e:
-            current_app.logger.error(f"Error fetching stocks: {str(e)}")
-            return {
-                'message': f"Error fetching stocks: {str(e)}",
-                'status': 'error'
-            }, 500
+        cache_key = ('all', tuple(fields) if fields else None, limit, start_after)
+        cached = _get_cached(cache_key)
+        if cached is not None:
+            return cached
+        
+        query = self.db.collection('stocks')
+        if fields:
+            query = query.select(fields)
+        if limit or start_after:
+            query = query.order_by('__name__')
+        if start_after:
+            query = query.start_after({'__name__': start_after})
+        if limit:
+            query = query.limit(limit)
+        
+        stocks = []
+        
+        for doc in query.stream():
+            stock_data = doc.to_dict()
+            stock_data['id'] = doc.id
+            stocks.append(stock_data)
+        
+        response = {
+            'stocks': stocks,
+            'count': len(stocks),
+            'status': 'success'
+        }
+        if limit:
+            response['next_cursor'] = stocks[-1]['id'] if len(stocks) == limit else None
+        
+        return _set_cached(cache_key, (response, 200))
     
+    @firestore_endpoint('fetching stock')
     def get_stock_by_symbol(self, symbol: str) -> Tuple[Dict, int]:
         """
         Get stock by symbol
@@ -55,38 +91,61 @@ class StocksService:
             symbol: Stock symbol
         Returns: Tuple of (response_dict, status_code)
         """
-        try:
-            if not self.db:
-                current_app.logger.error("Database connection not initialized")
-                return {
-                    'message': 'Database connection error',
-                    'status': 'error'
-                }, 500
-            
-            stock_ref = self.db.collection('stocks').document(symbol)
-            stock = stock_ref.get()
-            
-            if not stock.exists:
-                return {
-                    'message': f'Stock with symbol {symbol} not found',
-                    'status': 'error'
-                }, 404
-            
-            stock_data = stock.to_dict()
-            stock_data['id'] = stock.id
-            
-            return {
-                'stock': stock_data,
-                'status': 'success'
-            }, 200
-            
-        except Exception as e:
-            current_app.logger.error(f"Error fetching stock {symbol}: {str(e)}")
+        cached = _get_cached(symbol)
+        if cached is not None:
+            return cached
+        
+        stock_ref = self.db.collection('stocks').document(symbol)
+        stock = stock_ref.get()
+        
+        if not stock.exists:
             return {
-                'message': f"Error fetching stock: {str(e)}",
+                'message': f'Stock with symbol {symbol} not found',
                 'status': 'error'
-            }, 500
+            }, 404
+        
+        stock_data = stock.to_dict()
+        stock_data['id'] = stock.id
+        
+        result = {
+            'stock': stock_data,
+            'status': 'success'
+        }, 200
+        return _set_cached(symbol, result)
     
+    @firestore_endpoint('fetching stocks')
+    def get_stocks_by_symbols(self, symbols: List[str]) -> Tuple[Dict, int]:
+        """
+        Get several stocks in a single round trip
+        Args:
+            symbols: Stock symbols
+        Returns: Tuple of (response_dict, status_code)
+        """
+        if not symbols:
+            return {'stocks': {}, 'missing': [], 'count': 0, 'status': 'success'}, 200
+        
+        collection = self.db.collection('stocks')
+        refs = [collection.document(symbol) for symbol in dict.fromkeys(symbols)]
+        
+        stocks = {}
+        missing = []
+        
+        for doc in self.db.get_all(refs):
+            if doc.exists:
+                stock_data = doc.to_dict()
+                stock_data['id'] = doc.id
+                stocks[doc.id] = stock_data
+            else:
+                missing.append(doc.id)
+        
+        return {
+            'stocks': stocks,
+            'missing': missing,
+            'count': len(stocks),
+            'status': 'success'
+        }, 200
+    
+    @firestore_endpoint('adding stock')
     def add_stock(self, data: Dict) -> Tuple[Dict, int]:
         """
         Add new stock to database
@@ -94,51 +153,38 @@ class StocksService:
             data: Stock data dictionary
         Returns: Tuple of (response_dict, status_code)
         """
-        try:
-            if not self.db:
-                current_app.logger.error("Database connection not initialized")
-                return {
-                    'message': 'Database connection error',
-                    'status': 'error'
-                }, 500
-            
-            required_fields = ['symbol', 'name', 'price']
-            missing_fields = [field for field in required_fields if field not in data]
-            
-            if missing_fields:
-                return {
-                    'message': f'Missing required fields: {", ".join(missing_fields)}',
-                    'status': 'error'
-                }, 400
-            
-            # Check if stock already exists
-            stock_ref = self.db.collection('stocks').document(data['symbol'])
-            if stock_ref.get().exists:
-                return {
-                    'message': f'Stock with symbol {data["symbol"]} already exists',
-                    'status': 'error'
-                }, 409
-            
-            # Add timestamp
-            data['created_at'] = datetime.utcnow()
-            data['updated_at'] = datetime.utcnow()
-            
-            # Add stock to database
-            stock_ref.set(data)
-            
+        required_fields = ['symbol', 'name', 'price']
+        missing_fields = [field for field in required_fields if field not in data]
+        
+        if missing_fields:
             return {
-                'message': f'Stock {data["symbol"]} added successfully',
-                'stock': data,
-                'status': 'success'
-            }, 201
-            
-        except Exception as e:
-            current_app.logger.error(f"Error adding stock: {str(e)}")
+                'message': f'Missing required fields: {", ".join(missing_fields)}',
+                'status': 'error'
+            }, 400
+        
+        # Add timestamp
+        now = datetime.utcnow()
+        data['created_at'] = now
+        data['updated_at'] = now
+        
+        # Add stock to database; create() fails if the stock already exists
+        stock_ref = self.db.collection('stocks').document(data['symbol'])
+        try:
+            stock_ref.create(data)
+        except AlreadyExists:
             return {
-                'message': f"Error adding stock: {str(e)}",
+                'message': f'Stock with symbol {data["symbol"]} already exists',
                 'status': 'error'
-            }, 500
+            }, 409
+        _STOCKS_CACHE.clear()
+        
+        return {
+            'message': f'Stock {data["symbol"]} added successfully',
+            'stock': data,
+            'status': 'success'
+        }, 201
     
+    @firestore_endpoint('updating stock')
     def update_stock(self, symbol: str, data: Dict) -> Tuple[Dict, int]:
         """
         Update existing stock
@@ -147,44 +193,31 @@ class StocksService:
             data: Updated stock data
         Returns: Tuple of (response_dict, status_code)
         """
+        # Update timestamp
+        data['updated_at'] = datetime.utcnow()
+        
+        # Update stock; update() fails if the stock does not exist
+        stock_ref = self.db.collection('stocks').document(symbol)
         try:
-            if not self.db:
-                current_app.logger.error("Database connection not initialized")
-                return {
-                    'message': 'Database connection error',
-                    'status': 'error'
-                }, 500
-            
-            stock_ref = self.db.collection('stocks').document(symbol)
-            if not stock_ref.get().exists:
-                return {
-                    'message': f'Stock with symbol {symbol} not found',
-                    'status': 'error'
-                }, 404
-            
-            # Update timestamp
-            data['updated_at'] = datetime.utcnow()
-            
-            # Update stock
             stock_ref.update(data)
-            
-            # Get updated stock data
-            updated_stock = stock_ref.get().to_dict()
-            updated_stock['id'] = symbol
-            
-            return {
-                'message': f'Stock {symbol} updated successfully',
-                'stock': updated_stock,
-                'status': 'success'
-            }, 200
-            
-        except Exception as e:
-            current_app.logger.error(f"Error updating stock {symbol}: {str(e)}")
+        except NotFound:
             return {
-                'message': f"Error updating stock: {str(e)}",
+                'message': f'Stock with symbol {symbol} not found',
                 'status': 'error'
-            }, 500
+            }, 404
+        _STOCKS_CACHE.clear()
+        
+        # Get updated stock data
+        updated_stock = stock_ref.get().to_dict()
+        updated_stock['id'] = symbol
+        
+        return {
+            'message': f'Stock {symbol} updated successfully',
+            'stock': updated_stock,
+            'status': 'success'
+        }, 200
     
+    @firestore_endpoint('deleting stock')
     def delete_stock(self, symbol: str) -> Tuple[Dict, int]:
         """
         Delete stock from database
@@ -192,79 +225,70 @@ class StocksService:
             symbol: Stock symbol
         Returns: Tuple of (response_dict, status_code)
         """
+        # Delete stock, failing if it does not exist
+        stock_ref = self.db.collection('stocks').document(symbol)
         try:
-            if not self.db:
-                current_app.logger.error("Database connection not initialized")
-                return {
-                    'message': 'Database connection error',
-                    'status': 'error'
-                }, 500
-            
-            stock_ref = self.db.collection('stocks').document(symbol)
-            if not stock_ref.get().exists:
-                return {
-                    'message': f'Stock with symbol {symbol} not found',
-                    'status': 'error'
-                }, 404
-            
-            # Delete stock
-            stock_ref.delete()
-            
-            return {
-                'message': f'Stock {symbol} deleted successfully',
-                'status': 'success'
-            }, 200
-            
-        except Exception as e:
-            current_app.logger.error(f"Error deleting stock {symbol}: {str(e)}")
+            stock_ref.delete(option=self.db.write_option(exists=True))
+        except NotFound:
             return {
-                'message': f"Error deleting stock: {str(e)}",
+                'message': f'Stock with symbol {symbol} not found',
                 'status': 'error'
-            }, 500
+            }, 404
+        _STOCKS_CACHE.clear()
+        
+        return {
+            'message': f'Stock {symbol} deleted successfully',
+            'status': 'success'
+        }, 200
     
-    def get_stock_price_history(self, symbol: str) -> Tuple[Dict, int]:
+    @firestore_endpoint('fetching price history')
+    def get_stock_price_history(self, symbol: str, limit: int = PRICE_HISTORY_LIMIT,
+                                after: Optional[str] = None) -> Tuple[Dict, int]:
         """
-        Get price history for a stock
+        Get price history for a stock, newest first
         Args:
             symbol: Stock symbol
+            limit: Maximum number of entries to return
+            after: Price history entry id to continue after, from a previous next_cursor
         Returns: Tuple of (response_dict, status_code)
         """
-        try:
-            if not self.db:
-                current_app.logger.error("Database connection not initialized")
-                return {
-                    'message': 'Database connection error',
-                    'status': 'error'
-                }, 500
-            
-            # Get stock document
-            stock_ref = self.db.collection('stocks').document(symbol)
-            stock = stock_ref.get()
-            
-            if not stock.exists:
-                return {
-                    'message': f'Stock with symbol {symbol} not found',
-                    'status': 'error'
-                }, 404
-            
-            # Get price history subcollection
-            history_ref = stock_ref.collection('price_history')
-            history = []
-            
-            for doc in history_ref.order_by('timestamp', direction=firestore.Query.DESCENDING).stream():
-                history_data = doc.to_dict()
-                history_data['id'] = doc.id
-                history.append(history_data)
-            
+        if type(limit) is not int or limit < 1:
             return {
-                'symbol': symbol,
-                'price_history': history,
-                'status': 'success'
-            }, 200
-            
-        except Exception as e:
-            current_app.logger.error(f"Error fetching price history for stock {symbol}: {str(e)}")
+                'message': 'limit must be a positive integer',
+                'status': 'error'
+            }, 400
+        
+        # Get stock document
+        stock_ref = self.db.collection('stocks').document(symbol)
+        stock = stock_ref.get()
+        
+        if not stock.exists:
             return {
-                'message': f"Error fetching price history: {str(e)}",
+                'message': f'Stock with symbol {symbol} not found',
                 'status': 'error'
-            }, 500
\ No newline at end of file
+            }, 404
+        
+        # Get price history subcollection
+        history_ref = stock_ref.collection('price_history')
+        query = history_ref.order_by('timestamp', direction=firestore.Query.DESCENDING)
+        if after:
+            cursor = history_ref.document(after).get()
+            if not cursor.exists:
+                return {
+                    'message': f'Price history entry {after} not found',
+                    'status': 'error'
+                }, 400
+            query = query.start_after(cursor)
+        
+        history = []
+        for doc in query.limit(limit).stream():
+            history_data = doc.to_dict()
+            history_data['id'] = doc.id
+            history.append(history_data)
+        
+        return {
+            'symbol': symbol,
+            'price_history': history,
+            'next_cursor': history[-1].get('id') if len(history) == limit else None,
+            'status': 'success'
+        }, 200
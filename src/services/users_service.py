@@ -1,9 +1,66 @@
 # src/services/users_service.py
-from datetime import datetime
-from typing import Dict, List, Optional, Tuple
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
-from firebase_admin import auth, firestore
+from firebase_admin import auth, exceptions, firestore
 from flask import current_app
+from google.api_core.exceptions import GoogleAPIError
+
+from services.firebase_service import firestore_endpoint, set_role_claims
+from utils.cache import TTLCache
+from utils.executor import SharedExecutor
+from utils.validators import (get_cached_user, invalidate_cached_user, on_user_invalidated,
+                              validate_page_args)
+
+# Merged Auth + Firestore user responses, keyed by ('id', uid) and ('email', email)
+USER_CACHE_TTL = 30  # seconds
+_USER_CACHE = TTLCache(ttl=USER_CACHE_TTL, maxsize=10000)
+
+# Runs Firestore profile reads/deletes alongside Firebase Auth calls
+USERS_WORKERS = 16
+_executor = SharedExecutor(USERS_WORKERS)
+
+# Firebase Auth's get_users accepts at most this many identifiers per call
+AUTH_GET_USERS_LIMIT = 100
+
+# User listings read every profile as of this many seconds ago, so all pages
+# come from one consistent snapshot that Firestore can serve without
+# waiting on in-flight writes
+PROFILE_SNAPSHOT_LAG = 5  # seconds
+
+
+class PageArgumentError(ValueError):
+    """Invalid page_size or page_token for a user listing"""
+
+
+def _cache_user(result: Tuple[Dict, int]) -> None:
+    """Cache a successful user lookup under both its uid and its email"""
+    user_data = result[0]['user']
+    _USER_CACHE.set(('id', user_data['uid']), result)
+    if user_data.get('email'):
+        _USER_CACHE.set(('email', user_data['email']), result)
+
+def _serialize_user(user) -> Dict:
+    """Base response data for a Firebase Auth user record"""
+    metadata = user.user_metadata
+    return {
+        'uid': user.uid,
+        'email': user.email,
+        'emailVerified': user.email_verified,
+        'disabled': user.disabled,
+        'createdAt': metadata.creation_timestamp,
+        'lastSignIn': metadata.last_sign_in_timestamp
+    }
+
+@on_user_invalidated
+def _invalidate_user(user_id: str) -> None:
+    """
+    Drop cached lookups for a user after it changes
+    Runs from invalidate_cached_user, so every Auth update path clears these too
+    """
+    result = _USER_CACHE.pop(('id', user_id))
+    if result and result[0]['user'].get('email'):
+        _USER_CACHE.pop(('email', result[0]['user']['email']))
 
 
 class UsersService:
@@ -12,110 +69,195 @@ class UsersService:
     def __init__(self, firebase_service=None):
         """Initialize users service"""
         self.firebase_service = firebase_service
-        self.db = firebase_service.db if firebase_service else None
     
-    def get_all_users(self) -> Tuple[Dict, int]:
-        """Get all users"""
+    @property
+    def db(self):
+        """Firestore client for the calling thread, from the Firebase service's pool"""
+        return self.firebase_service.db if self.firebase_service else None
+    
+    @firestore_endpoint('fetching users')
+    def get_all_users(self, fields: Optional[List[str]] = None, page_size: Optional[int] = None,
+                      page_token: Optional[str] = None) -> Tuple[Dict, int]:
+        """
+        Get all users, or a single page of them when page_size is given
+        Args:
+            fields: Only fetch these Firestore profile fields (server-side projection)
+            page_size: Maximum number of users to return
+            page_token: next_cursor from a previous page
+        Returns: Tuple of (response_dict, status_code)
+        """
+        users_list = []
+        next_cursor = None
         try:
-            if not self.db:
-                current_app.logger.error("Database connection not initialized")
-                return {
-                    'message': 'Database connection error',
-                    'status': 'error'
-                }, 500
-            
-            # Get users from Firebase Auth
-            users_list = []
-            page = auth.list_users()
+            for users, next_cursor in self.iter_user_pages(fields, page_size, page_token):
+                for user, profile in users:
+                    user_data = _serialize_user(user)
+                    user_data.update(profile)
+                    users_list.append(user_data)
+        except PageArgumentError as e:
+            return {
+                'message': str(e),
+                'status': 'error'
+            }, 400
+        
+        response = {
+            'users': users_list,
+            'count': len(users_list),
+            'status': 'success'
+        }
+        if page_size:
+            response['next_cursor'] = next_cursor
+        
+        return response, 200
+    
+    def iter_user_pages(self, fields: Optional[List[str]] = None, page_size: Optional[int] = None,
+                        page_token: Optional[str] = None
+                        ) -> Iterator[Tuple[List[Tuple[Any, Dict]], Optional[str]]]:
+        """
+        Yield each page of Auth users as ([(user_record, profile), ...], next_cursor)
+        Every page, or only one when page_size is given, is read with its
+        Firestore profiles as of one snapshot; the next page is listed while
+        the current one is consumed. next_cursor is None unless page_size is
+        given and more users follow
+        Args:
+            fields: Only fetch these Firestore profile fields (server-side projection)
+            page_size: Maximum number of users to return, as an int or query string value
+            page_token: next_cursor from a previous page
+        Raises: PageArgumentError (on the first next()) for invalid pagination arguments
+        """
+        error = validate_page_args(page_size, page_token)
+        if error:
+            raise PageArgumentError(error)
+        
+        try:
+            if page_size:
+                page = auth.list_users(page_token=page_token, max_results=int(page_size))
+            else:
+                page = auth.list_users()
+        except exceptions.InvalidArgumentError as e:
+            # Auth rejects page tokens it didn't issue
+            raise PageArgumentError('Invalid page_token') from e
+        
+        read_time = datetime.now(timezone.utc) - timedelta(seconds=PROFILE_SNAPSHOT_LAG)
+        while page:
+            refs = [self.db.collection('users').document(user.uid) for user in page.users]
+            profiles_future = _executor.submit(self._get_profiles, refs, fields, read_time) if refs else None
+            next_page = None if page_size else _executor.submit(page.get_next_page)
             
-            for user in page.users:
-                # Get additional user data from Firestore if it exists
-                user_data = {
-                    'uid': user.uid,
-                    'email': user.email,
-                    'emailVerified': user.email_verified,
-                    'disabled': user.disabled,
-                    'createdAt': user.user_metadata.creation_timestamp,
-                    'lastSignIn': user.user_metadata.last_sign_in_timestamp
-                }
-                
-                # Try to get additional user data from Firestore
+            # Only Firestore API errors degrade to Auth-only data; anything
+            # else is a bug and fails the listing
+            profiles = {}
+            if profiles_future:
                 try:
-                    doc = self.db.collection('users').document(user.uid).get()
-                    if doc.exists:
-                        user_data.update(doc.to_dict())
-                except Exception as e:
-                    current_app.logger.warning(f"Error fetching Firestore data for user {user.uid}: {str(e)}")
-                
-                users_list.append(user_data)
+                    profiles = profiles_future.result()
+                except GoogleAPIError as e:
+                    current_app.logger.warning(f"Error fetching Firestore data for users: {str(e)}")
             
-            return {
-                'users': users_list,
-                'count': len(users_list),
-                'status': 'success'
-            }, 200
+            next_cursor = (page.next_page_token or None) if page_size else None
+            yield [(user, profiles.get(user.uid, {})) for user in page.users], next_cursor
             
-        except Exception as e:
-            current_app.logger.error(f"Error fetching users: {str(e)}")
-            return {
-                'message': f"Error fetching users: {str(e)}",
-                'status': 'error'
-            }, 500
+            page = next_page.result() if next_page else None
     
-    def get_user_by_id(self, user_id: str) -> Tuple[Dict, int]:
+    def _get_profiles(self, refs: List, fields: Optional[List[str]] = None,
+                      read_time: Optional[datetime] = None) -> Dict[str, Dict]:
+        """
+        Read several user profile documents in one batch, keyed by uid
+        Pass read_time to read them as of that snapshot rather than now
+        """
+        options = {'read_time': read_time} if read_time else {}
+        return {
+            doc.id: doc.to_dict()
+            for doc in self.db.get_all(refs, field_paths=fields, **options)
+            if doc.exists
+        }
+    
+    @firestore_endpoint('fetching user')
+    def get_user_by_id(self, user_id: str, fields: Optional[List[str]] = None) -> Tuple[Dict, int]:
         """
         Get user by ID
         Args:
             user_id: Firebase user ID
+            fields: Only fetch these Firestore profile fields (server-side projection)
         Returns: Tuple of (response_dict, status_code)
         """
+        cached = None if fields else _USER_CACHE.get(('id', user_id))
+        if cached is not None:
+            return cached
+        
+        # The Auth and Firestore reads are independent, so run them together
+        user_ref = self.db.collection('users').document(user_id)
+        doc_future = _executor.submit(user_ref.get, field_paths=fields)
+        
+        # Get user from Firebase Auth, shared with the auth decorators
         try:
-            if not self.db:
-                current_app.logger.error("Database connection not initialized")
-                return {
-                    'message': 'Database connection error',
-                    'status': 'error'
-                }, 500
-            
-            # Get user from Firebase Auth
-            try:
-                user = auth.get_user(user_id)
-            except auth.UserNotFoundError:
-                return {
-                    'message': f'User with ID {user_id} not found',
-                    'status': 'error'
-                }, 404
-            
-            # Create base user data
-            user_data = {
-                'uid': user.uid,
-                'email': user.email,
-                'emailVerified': user.email_verified,
-                'disabled': user.disabled,
-                'createdAt': user.user_metadata.creation_timestamp,
-                'lastSignIn': user.user_metadata.last_sign_in_timestamp
-            }
-            
-            # Try to get additional user data from Firestore
-            try:
-                doc = self.db.collection('users').document(user_id).get()
-                if doc.exists:
-                    user_data.update(doc.to_dict())
-            except Exception as e:
-                current_app.logger.warning(f"Error fetching Firestore data for user {user_id}: {str(e)}")
-            
-            return {
-                'user': user_data,
-                'status': 'success'
-            }, 200
-            
-        except Exception as e:
-            current_app.logger.error(f"Error fetching user {user_id}: {str(e)}")
+            user = get_cached_user(user_id)
+        except auth.UserNotFoundError:
+            doc_future.cancel()
             return {
-                'message': f"Error fetching user: {str(e)}",
+                'message': f'User with ID {user_id} not found',
                 'status': 'error'
-            }, 500
+            }, 404
+        
+        # Create base user data
+        user_data = _serialize_user(user)
+        
+        # Try to get additional user data from Firestore
+        try:
+            doc = doc_future.result()
+            if doc.exists:
+                user_data.update(doc.to_dict())
+        except GoogleAPIError as e:
+            current_app.logger.warning(f"Error fetching Firestore data for user {user_id}: {str(e)}")
+        
+        result = {
+            'user': user_data,
+            'status': 'success'
+        }, 200
+        if not fields:
+            _cache_user(result)
+        return result
     
+    @firestore_endpoint('fetching users')
+    def get_users_by_ids(self, user_ids: List[str], fields: Optional[List[str]] = None) -> Tuple[Dict, int]:
+        """
+        Get several users at once
+        Args:
+            user_ids: Firebase user IDs
+            fields: Only fetch these Firestore profile fields (server-side projection)
+        Returns: Tuple of (response_dict, status_code)
+        """
+        user_ids = list(dict.fromkeys(user_ids))
+        if not user_ids:
+            return {'users': {}, 'not_found': [], 'count': 0, 'status': 'success'}, 200
+        
+        # Read every profile in one batch while the Auth records are fetched
+        refs = [self.db.collection('users').document(uid) for uid in user_ids]
+        profiles_future = _executor.submit(self._get_profiles, refs, fields)
+        
+        users = {}
+        for i in range(0, len(user_ids), AUTH_GET_USERS_LIMIT):
+            identifiers = [auth.UidIdentifier(uid) for uid in user_ids[i:i + AUTH_GET_USERS_LIMIT]]
+            for user in auth.get_users(identifiers).users:
+                users[user.uid] = _serialize_user(user)
+        
+        # Try to get additional user data from Firestore
+        try:
+            profiles = profiles_future.result()
+        except GoogleAPIError as e:
+            current_app.logger.warning(f"Error fetching Firestore data for users: {str(e)}")
+            profiles = {}
+        
+        for uid, user_data in users.items():
+            user_data.update(profiles.get(uid, {}))
+        
+        return {
+            'users': users,
+            'not_found': [uid for uid in user_ids if uid not in users],
+            'count': len(users),
+            'status': 'success'
+        }, 200
+    
+    @firestore_endpoint('updating user')
     def update_user(self, user_id: str, data: Dict) -> Tuple[Dict, int]:
         """
         Update user profile
@@ -124,58 +266,41 @@ class UsersService:
             data: Updated user data
         Returns: Tuple of (response_dict, status_code)
         """
+        # Check if user exists
         try:
-            if not self.db:
-                current_app.logger.error("Database connection not initialized")
-                return {
-                    'message': 'Database connection error',
-                    'status': 'error'
-                }, 500
-            
-            # Check if user exists
-            try:
-                user = auth.get_user(user_id)
-            except auth.UserNotFoundError:
-                return {
-                    'message': f'User with ID {user_id} not found',
-                    'status': 'error'
-                }, 404
-            
-            # Update user data in Firestore
-            try:
-                # Add timestamp
-                data['updated_at'] = datetime.utcnow()
-                
-                user_ref = self.db.collection('users').document(user_id)
-                user_ref.set(data, merge=True)
-                
-                # Get updated user data
-                updated_data = user_ref.get().to_dict()
-                
-                return {
-                    'message': 'User updated successfully',
-                    'user': {
-                        'uid': user_id,
-                        'email': user.email,
-                        'emailVerified': user.email_verified,
-                        **updated_data
-                    },
-                    'status': 'success'
-                }, 200
-                
-            except Exception as e:
-                return {
-                    'message': f'Error updating user data: {str(e)}',
-                    'status': 'error'
-                }, 500
-            
-        except Exception as e:
-            current_app.logger.error(f"Error updating user {user_id}: {str(e)}")
+            user = auth.get_user(user_id)
+        except auth.UserNotFoundError:
             return {
-                'message': f"Error updating user: {str(e)}",
+                'message': f'User with ID {user_id} not found',
                 'status': 'error'
-            }, 500
+            }, 404
+        
+        # Update user data in Firestore
+        data['updated_at'] = firestore.SERVER_TIMESTAMP
+        
+        user_ref = self.db.collection('users').document(user_id)
+        write_result = user_ref.set(data, merge=True)
+        invalidate_cached_user(user_id)
+        
+        # Keep the Auth claims used for access control in step with the profile
+        if 'role' in data:
+            set_role_claims(user, data['role'])
+        
+        # Echo the written fields rather than reading the document back;
+        # the commit time is the value the server timestamp resolved to
+        return {
+            'message': 'User updated successfully',
+            'user': {
+                'uid': user_id,
+                'email': user.email,
+                'emailVerified': user.email_verified,
+                **data,
+                'updated_at': write_result.update_time
+            },
+            'status': 'success'
+        }, 200
     
+    @firestore_endpoint('deleting user')
     def delete_user(self, user_id: str) -> Tuple[Dict, int]:
         """
         Delete user
@@ -183,96 +308,66 @@ class UsersService:
             user_id: Firebase user ID
         Returns: Tuple of (response_dict, status_code)
         """
+        # Delete user data from Firestore while the Auth user is deleted
+        user_ref = self.db.collection('users').document(user_id)
+        delete_future = _executor.submit(user_ref.delete)
+        
+        # Delete user from Firebase Auth
         try:
-            if not self.db:
-                current_app.logger.error("Database connection not initialized")
-                return {
-                    'message': 'Database connection error',
-                    'status': 'error'
-                }, 500
-            
-            # Delete user from Firebase Auth
-            try:
-                auth.delete_user(user_id)
-            except auth.UserNotFoundError:
-                return {
-                    'message': f'User with ID {user_id} not found',
-                    'status': 'error'
-                }, 404
-            
-            # Delete user data from Firestore
-            try:
-                user_ref = self.db.collection('users').document(user_id)
-                user_ref.delete()
-                
-                return {
-                    'message': 'User deleted successfully',
-                    'status': 'success'
-                }, 200
-                
-            except Exception as e:
-                return {
-                    'message': f'Error deleting user data: {str(e)}',
-                    'status': 'error'
-                }, 500
-            
-        except Exception as e:
-            current_app.logger.error(f"Error deleting user {user_id}: {str(e)}")
+            auth.delete_user(user_id)
+            invalidate_cached_user(user_id)
+        except auth.UserNotFoundError:
+            # Any leftover profile document is still removed
+            delete_future.exception()
             return {
-                'message': f"Error deleting user: {str(e)}",
+                'message': f'User with ID {user_id} not found',
                 'status': 'error'
-            }, 500
+            }, 404
+        
+        delete_future.result()
+        
+        return {
+            'message': 'User deleted successfully',
+            'status': 'success'
+        }, 200
     
-    def get_user_by_email(self, email: str) -> Tuple[Dict, int]:
+    @firestore_endpoint('fetching user')
+    def get_user_by_email(self, email: str, fields: Optional[List[str]] = None) -> Tuple[Dict, int]:
         """
         Get user by email
         Args:
             email: User email address
+            fields: Only fetch these Firestore profile fields (server-side projection)
         Returns: Tuple of (response_dict, status_code)
         """
+        cached = None if fields else _USER_CACHE.get(('email', email))
+        if cached is not None:
+            return cached
+        
+        # Get user from Firebase Auth
         try:
-            if not self.db:
-                current_app.logger.error("Database connection not initialized")
-                return {
-                    'message': 'Database connection error',
-                    'status': 'error'
-                }, 500
-            
-            # Get user from Firebase Auth
-            try:
-                user = auth.get_user_by_email(email)
-            except auth.UserNotFoundError:
-                return {
-                    'message': f'User with email {email} not found',
-                    'status': 'error'
-                }, 404
-            
-            # Create base user data
-            user_data = {
-                'uid': user.uid,
-                'email': user.email,
-                'emailVerified': user.email_verified,
-                'disabled': user.disabled,
-                'createdAt': user.user_metadata.creation_timestamp,
-                'lastSignIn': user.user_metadata.last_sign_in_timestamp
-            }
-            
-            # Try to get additional user data from Firestore
-            try:
-                doc = self.db.collection('users').document(user.uid).get()
-                if doc.exists:
-                    user_data.update(doc.to_dict())
-            except Exception as e:
-                current_app.logger.warning(f"Error fetching Firestore data for user {user.uid}: {str(e)}")
-            
+            user = auth.get_user_by_email(email)
+        except auth.UserNotFoundError:
             return {
-                'user': user_data,
-                'status': 'success'
-            }, 200
-            
-        except Exception as e:
-            current_app.logger.error(f"Error fetching user by email {email}: {str(e)}")
-            return {
-                'message': f"Error fetching user: {str(e)}",
+                'message': f'User with email {email} not found',
                 'status': 'error'
-            }, 500
\ No newline at end of file
+            }, 404
+        
+        # Create base user data
+        user_data = _serialize_user(user)
+        
+        # Try to get additional user data from Firestore
+        try:
+            doc = self.db.collection('users').document(user.uid).get(field_paths=fields)
+            if doc.exists:
+                user_data.update(doc.to_dict())
+        except GoogleAPIError as e:
+            current_app.logger.warning(f"Error fetching Firestore data for user {user.uid}: {str(e)}")
+        
+        result = {
+            'user': user_data,
+            'status': 'success'
+        }, 200
+        if not fields:
+            _cache_user(result)
+        return result
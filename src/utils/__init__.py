@@ -1,5 +1,13 @@
 # src/utils/__init__.py
-from .validators import (admin_required, token_required, validate_stock_data,
-                         validate_user_data)
+from .cache import TTLCache
+from .executor import SharedExecutor, reset_executors
+from .json_provider import OrjsonProvider, dump_json, json_bytes_response
+from .validators import (admin_required, get_cached_user, invalidate_cached_user,
+                         on_user_invalidated, token_required, validate_page_args,
+                         validate_stock_data, validate_user_data)
 
-__all__ = ['token_required', 'admin_required', 'validate_user_data', 'validate_stock_data']
+__all__ = ['token_required', 'admin_required', 'validate_user_data', 'validate_stock_data',
+           'validate_page_args',
+           'get_cached_user', 'invalidate_cached_user', 'on_user_invalidated', 'TTLCache',
+           'OrjsonProvider', 'dump_json', 'json_bytes_response', 'SharedExecutor',
+           'reset_executors']
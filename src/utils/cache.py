@@ -0,0 +1,66 @@
+# src/utils/cache.py
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+
+class TTLCache:
+    """Thread-safe, process-local cache whose entries expire after a fixed TTL"""
+
+    def __init__(self, ttl: float, maxsize: Optional[int] = None):
+        """
+        Initialize cache
+        Args:
+            ttl: Lifetime of each entry in seconds
+            maxsize: Optional upper bound on the number of entries
+        """
+        self.ttl = ttl
+        self.maxsize = maxsize
+        # Kept in write order, so the oldest entry is always at the head
+        self._data: Dict[Hashable, Tuple[Any, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value for key, or default if missing/expired"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            value, expires_at = entry
+            if time.monotonic() >= expires_at:
+                del self._data[key]
+                return default
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Store value under key, optionally overriding the default TTL"""
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+            elif self.maxsize and len(self._data) >= self.maxsize:
+                # Drop the oldest write; O(1), unlike scanning for expired entries
+                self._data.popitem(last=False)
+            self._data[key] = (value, expires_at)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Remove key and return its value (expired or not)"""
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return entry[0] if entry else default
+
+    def clear(self) -> None:
+        """Remove all entries"""
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+
+_MISSING = object()
@@ -0,0 +1,41 @@
+# src/utils/executor.py
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Iterable, Iterator, List
+
+
+class SharedExecutor:
+    """
+    Module-level thread pool that pre-forking servers can recreate after fork
+    A forked child inherits none of the parent's pool threads, so every
+    instance is registered and replaced by reset_executors()
+    """
+
+    def __init__(self, max_workers: int):
+        """
+        Initialize executor
+        Args:
+            max_workers: Number of pool threads
+        """
+        self.max_workers = max_workers
+        self._pool = ThreadPoolExecutor(max_workers=max_workers)
+        _executors.append(self)
+
+    def submit(self, fn: Callable, *args: Any, **kwargs: Any) -> Future:
+        """Schedule fn(*args, **kwargs) on the pool"""
+        return self._pool.submit(fn, *args, **kwargs)
+
+    def map(self, fn: Callable, *iterables: Iterable) -> Iterator:
+        """Like the builtin map, running the calls on the pool"""
+        return self._pool.map(fn, *iterables)
+
+    def reset(self) -> None:
+        """Replace the pool with a fresh one of the same size"""
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers)
+
+
+_executors: List[SharedExecutor] = []
+
+def reset_executors() -> None:
+    """Recreate every SharedExecutor; call in each worker after fork"""
+    for executor in _executors:
+        executor.reset()
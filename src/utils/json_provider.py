@@ -0,0 +1,60 @@
+# src/utils/json_provider.py
+from datetime import date
+from typing import Any
+
+import orjson
+from flask import current_app
+from flask.json.provider import DefaultJSONProvider, JSONProvider
+
+
+class OrjsonProvider(JSONProvider):
+    """Flask JSON provider backed by orjson
+
+    datetimes are serialized as ISO 8601 strings, including subclasses such as
+    the DatetimeWithNanoseconds timestamps Firestore returns; other types Flask
+    knows how to serialize (UUID, Decimal, dataclasses, ...) fall back to
+    Flask's default handler.
+    """
+
+    option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+    @staticmethod
+    def default(obj: Any) -> Any:
+        """Serialize types orjson doesn't handle natively"""
+        # orjson only accepts exact datetime/date instances
+        if isinstance(obj, date):
+            return obj.isoformat()
+        return DefaultJSONProvider.default(obj)
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        """Serialize data as JSON to a string"""
+        return self.dumpb(obj).decode()
+
+    def dumpb(self, obj: Any, option: int = 0) -> bytes:
+        """Serialize data as JSON to UTF-8 bytes"""
+        return orjson.dumps(obj, default=self.default, option=self.option | option)
+
+    def loads(self, s: Any, **kwargs: Any) -> Any:
+        """Deserialize data from a JSON string or bytes"""
+        return orjson.loads(s)
+
+    def response(self, *args: Any, **kwargs: Any):
+        """Serialize the given arguments as a JSON response"""
+        obj = self._prepare_response_obj(args, kwargs)
+        option = orjson.OPT_INDENT_2 if self._app.debug else 0
+        return self._app.response_class(
+            self.dumpb(obj, option | orjson.OPT_APPEND_NEWLINE),
+            mimetype='application/json'
+        )
+
+
+def dump_json(obj: Any) -> bytes:
+    """Serialize data with the current app's JSON provider, for caching the bytes"""
+    provider = current_app.json
+    if isinstance(provider, OrjsonProvider):
+        return provider.dumpb(obj)
+    return provider.dumps(obj).encode()
+
+def json_bytes_response(body: bytes, status: int = 200):
+    """Build a JSON response from already serialized bytes"""
+    return current_app.response_class(body, status=status, mimetype='application/json')
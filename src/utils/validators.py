@@ -1,10 +1,95 @@
 # src/utils/validators.py
-from functools import wraps
+import hashlib
+import re
+import time
+from functools import lru_cache, wraps
 from typing import Dict, Optional
 
 import jwt
 from firebase_admin import auth
-from flask import current_app, jsonify, request
+from flask import current_app, g, has_app_context, jsonify, request
+
+from .cache import TTLCache
+
+# Upper bound on how long a verified token or Firebase user record is reused
+AUTH_CACHE_TTL = 60  # seconds
+
+# blake2b(token) digest keyed by the signing secret -> payload, for tokens that
+# passed verification; keying on the secret keeps apps in one process from
+# accepting each other's tokens
+_TOKEN_CACHE = TTLCache(ttl=AUTH_CACHE_TTL, maxsize=50000)
+
+# user id -> Firebase Auth UserRecord
+_USER_CACHE = TTLCache(ttl=AUTH_CACHE_TTL, maxsize=10000)
+
+# Called with the user id by invalidate_cached_user, for caches built from user records
+_invalidation_hooks = []
+
+@lru_cache(maxsize=16)
+def _cache_key_secret(secret: str) -> bytes:
+    """A blake2b key (at most 64 bytes) derived from a JWT secret"""
+    return hashlib.blake2b(secret.encode()).digest()
+
+def _decode_token(token: str) -> Dict:
+    """
+    Verify a JWT and return its payload
+    Successful verifications are cached until the token expires or for
+    AUTH_CACHE_TTL seconds, whichever comes first
+    Raises: jwt.InvalidTokenError (or subclass) if the token is not valid
+    """
+    secret = current_app.config['JWT_SECRET_KEY']
+    key = hashlib.blake2b(token.encode(), key=_cache_key_secret(secret), digest_size=16).digest()
+    payload = _TOKEN_CACHE.get(key)
+    if payload is None:
+        payload = jwt.decode(
+            token,
+            secret,
+            algorithms=["HS256"]
+        )
+        ttl = min(payload.get('exp', 0) - time.time(), AUTH_CACHE_TTL)
+        if ttl > 0:
+            _TOKEN_CACHE.set(key, payload, ttl=ttl)
+    return payload
+
+def _request_users() -> Dict:
+    """User records already looked up during the current request"""
+    if not has_app_context():
+        return {}
+    if 'user_records' not in g:
+        g.user_records = {}
+    return g.user_records
+
+def get_cached_user(user_id: str):
+    """
+    Get a Firebase Auth user, reusing records fetched in the last AUTH_CACHE_TTL seconds
+    Within a request the same record is returned every time, so the decorator
+    and the handler it wraps share one lookup
+    Raises: auth.UserNotFoundError if the user does not exist
+    """
+    request_users = _request_users()
+    user = request_users.get(user_id)
+    if user is None:
+        user = _USER_CACHE.get(user_id)
+        if user is None:
+            user = auth.get_user(user_id)
+            _USER_CACHE.set(user_id, user)
+        request_users[user_id] = user
+    return user
+
+def invalidate_cached_user(user_id: str) -> None:
+    """
+    Drop a cached Firebase Auth user after it is updated or deleted
+    Caches registered with on_user_invalidated are cleared too
+    """
+    _USER_CACHE.pop(user_id)
+    _request_users().pop(user_id, None)
+    for hook in _invalidation_hooks:
+        hook(user_id)
+
+def on_user_invalidated(hook):
+    """Register hook(user_id) to run whenever invalidate_cached_user is called"""
+    _invalidation_hooks.append(hook)
+    return hook
 
 
 def token_required(f):
@@ -32,16 +117,11 @@ def token_required(f):
         
         try:
             # Verify JWT token
-            payload = jwt.decode(
-                token,
-                current_app.config['JWT_SECRET_KEY'],
-                algorithms=["HS256"]
-            )
-            current_user = payload['sub']
+            current_user = _decode_token(token)['sub']
             
             # Verify user exists in Firebase
             try:
-                user = auth.get_user(current_user)
+                user = get_cached_user(current_user)
                 if user.disabled:
                     return jsonify({
                         'message': 'User account is disabled',
@@ -98,18 +178,19 @@ def admin_required(f):
         
         try:
             # Verify JWT token
-            payload = jwt.decode(
-                token,
-                current_app.config['JWT_SECRET_KEY'],
-                algorithms=["HS256"]
-            )
-            current_user = payload['sub']
+            current_user = _decode_token(token)['sub']
             
-            # Verify user is admin in Firebase
+            # Verify user is admin in Firebase; the token's own role claims may
+            # be stale, so the current account state always decides
             try:
-                user = auth.get_user(current_user)
-                custom_claims = user.custom_claims or {}
+                user = get_cached_user(current_user)
+                if user.disabled:
+                    return jsonify({
+                        'message': 'User account is disabled',
+                        'status': 'error'
+                    }), 401
                 
+                custom_claims = user.custom_claims or {}
                 if not custom_claims.get('admin', False):
                     return jsonify({
                         'message': 'Admin privileges required',
@@ -143,6 +224,11 @@ def admin_required(f):
     
     return decorated
 
+# Request bodies come from JSON, so the validators below use plain type() checks
+
+# Basic address shape: no whitespace, one @, and a dot in the domain
+_EMAIL_RE = re.compile(r'[^@\s]+@[^@\s]+\.[^@\s]+')
+
 def validate_user_data(data: Dict) -> Optional[str]:
     """
     Validate user registration/update data
@@ -155,16 +241,46 @@ def validate_user_data(data: Dict) -> Optional[str]:
     
     if 'email' in data:
         email = data['email']
-        if not isinstance(email, str) or '@' not in email:
+        if type(email) is not str or _EMAIL_RE.fullmatch(email) is None:
             return "Invalid email format"
     
     if 'password' in data:
         password = data['password']
-        if not isinstance(password, str) or len(password) < 6:
+        if type(password) is not str or len(password) < 6:
             return "Password must be at least 6 characters"
     
     return None
 
+# Firebase Auth's list_users returns at most this many users per page
+LIST_USERS_MAX_RESULTS = 1000
+
+def validate_page_args(page_size, page_token) -> Optional[str]:
+    """
+    Validate user listing pagination arguments
+    Args:
+        page_size: Requested page size, as an int or query string value; None for all users
+        page_token: next_cursor from a previous page, if any
+    Returns: Error message if validation fails, None otherwise
+    """
+    if page_size is None:
+        return "page_token requires page_size" if page_token is not None else None
+    
+    try:
+        page_size = int(page_size)
+    except (ValueError, TypeError):
+        return "page_size must be an integer"
+    if not 1 <= page_size <= LIST_USERS_MAX_RESULTS:
+        return f"page_size must be between 1 and {LIST_USERS_MAX_RESULTS}"
+    
+    if page_token is not None and (type(page_token) is not str or not page_token):
+        return "Invalid page_token"
+    
+    return None
+
+# Required stock fields, in the order they're reported when missing
+_STOCK_REQUIRED_FIELDS = ('symbol', 'name', 'price')
+_STOCK_REQUIRED = frozenset(_STOCK_REQUIRED_FIELDS)
+
 def validate_stock_data(data: Dict) -> Optional[str]:
     """
     Validate stock data
@@ -175,16 +291,16 @@ def validate_stock_data(data: Dict) -> Optional[str]:
     if not data:
         return "No data provided"
     
-    required_fields = ['symbol', 'name', 'price']
-    missing_fields = [field for field in required_fields if field not in data]
-    
-    if missing_fields:
+    if not _STOCK_REQUIRED.issubset(data):
+        missing_fields = [field for field in _STOCK_REQUIRED_FIELDS if field not in data]
         return f"Missing required fields: {', '.join(missing_fields)}"
     
-    if not isinstance(data['symbol'], str) or not data['symbol']:
+    symbol = data['symbol']
+    if type(symbol) is not str or not symbol:
         return "Invalid symbol"
     
-    if not isinstance(data['name'], str) or not data['name']:
+    name = data['name']
+    if type(name) is not str or not name:
         return "Invalid name"
     
     try:
@@ -0,0 +1,40 @@
+# tests/conftest.py
+import os
+import sys
+import time
+
+import jwt
+import pytest
+from flask import Flask
+
+# The application modules import each other relative to src/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from utils import validators  # noqa: E402
+
+JWT_SECRET = 'test-secret'
+
+
+@pytest.fixture
+def app():
+    """Bare Flask app with just the settings the auth helpers read"""
+    app = Flask(__name__)
+    app.config['JWT_SECRET_KEY'] = JWT_SECRET
+    return app
+
+
+@pytest.fixture(autouse=True)
+def clear_auth_caches():
+    """Keep verified tokens and user records from leaking between tests"""
+    validators._TOKEN_CACHE.clear()
+    validators._USER_CACHE.clear()
+    yield
+    validators._TOKEN_CACHE.clear()
+    validators._USER_CACHE.clear()
+
+
+def make_token(user_id, **claims):
+    """HS256 token for user_id, valid for an hour"""
+    now = int(time.time())
+    payload = {'exp': now + 3600, 'iat': now, 'sub': user_id, **claims}
+    return jwt.encode(payload, JWT_SECRET, algorithm='HS256')
@@ -0,0 +1,173 @@
+# tests/test_auth.py
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest import mock
+
+import pytest
+import jwt
+from firebase_admin import auth
+from flask import Flask
+
+from api import auth as auth_api
+from services.auth_service import AuthService
+from utils import validators
+from utils.validators import admin_required, token_required
+
+from .conftest import JWT_SECRET, make_token
+
+
+def _user(uid, disabled=False, custom_claims=None):
+    """Stand-in for a Firebase Auth UserRecord"""
+    return SimpleNamespace(uid=uid, disabled=disabled, custom_claims=custom_claims)
+
+
+@pytest.fixture
+def auth_service():
+    config = SimpleNamespace(JWT_SECRET_KEY=JWT_SECRET,
+                             JWT_ACCESS_TOKEN_EXPIRES=timedelta(hours=1))
+    return AuthService(config=config)
+
+
+@admin_required
+def _admin_view(current_user):
+    return current_user
+
+
+def _call_admin_view(app, token):
+    with app.test_request_context(headers={'Authorization': f'Bearer {token}'}):
+        result = _admin_view()
+    return result if isinstance(result, tuple) else (result, 200)
+
+
+@token_required
+def _user_view(current_user):
+    return current_user
+
+
+class TestTokenRequired:
+    def _call(self, app, token):
+        with app.test_request_context(headers={'Authorization': f'Bearer {token}'}):
+            result = _user_view()
+        return result if isinstance(result, tuple) else (result, 200)
+
+    def test_verified_tokens_and_users_are_reused(self, app):
+        token = make_token('u1')
+        with mock.patch.object(auth, 'get_user', return_value=_user('u1')) as get_user, \
+                mock.patch.object(validators.jwt, 'decode', wraps=jwt.decode) as decode:
+            assert self._call(app, token) == ('u1', 200)
+            assert self._call(app, token) == ('u1', 200)
+        assert decode.call_count == 1
+        assert get_user.call_count == 1
+
+    def test_disabled_user_is_rejected(self, app):
+        with mock.patch.object(auth, 'get_user', return_value=_user('u1', disabled=True)):
+            _, status = self._call(app, make_token('u1'))
+        assert status == 401
+
+    def test_expired_token_is_rejected(self, app):
+        _, status = self._call(app, make_token('u1', exp=1))
+        assert status == 401
+
+    def test_verification_cached_by_one_app_does_not_apply_to_another(self, app):
+        other_app = Flask(__name__)
+        other_app.config['JWT_SECRET_KEY'] = 'other-secret'
+        token = make_token('u1')
+        with mock.patch.object(auth, 'get_user', return_value=_user('u1')):
+            assert self._call(app, token) == ('u1', 200)
+            _, status = self._call(other_app, token)
+        assert status == 401
+
+
+class TestAdminRequired:
+    def test_current_admin_is_allowed(self, app):
+        with mock.patch.object(auth, 'get_user', return_value=_user('u1', custom_claims={'admin': True})):
+            assert _call_admin_view(app, make_token('u1', admin=True)) == ('u1', 200)
+
+    def test_non_admin_is_forbidden(self, app):
+        with mock.patch.object(auth, 'get_user', return_value=_user('u1')):
+            _, status = _call_admin_view(app, make_token('u1'))
+        assert status == 403
+
+    def test_deleted_admin_is_rejected(self, app):
+        error = auth.UserNotFoundError('No user record found')
+        with mock.patch.object(auth, 'get_user', side_effect=error):
+            _, status = _call_admin_view(app, make_token('u1', admin=True, role='admin'))
+        assert status == 401
+
+    def test_disabled_admin_is_rejected(self, app):
+        user = _user('u1', disabled=True, custom_claims={'admin': True})
+        with mock.patch.object(auth, 'get_user', return_value=user):
+            _, status = _call_admin_view(app, make_token('u1', admin=True, role='admin'))
+        assert status == 401
+
+    @pytest.mark.parametrize('claims', [None, {'admin': False, 'role': 'user'}])
+    def test_demoted_admin_is_forbidden(self, app, claims):
+        with mock.patch.object(auth, 'get_user', return_value=_user('u1', custom_claims=claims)):
+            _, status = _call_admin_view(app, make_token('u1', admin=True, role='admin'))
+        assert status == 403
+
+
+class TestGenerateToken:
+    @pytest.mark.parametrize('expires, ttl', [(timedelta(minutes=30), 1800), (90, 90)])
+    def test_expiry_is_the_configured_lifetime(self, expires, ttl):
+        service = AuthService(config=SimpleNamespace(JWT_SECRET_KEY=JWT_SECRET,
+                                                     JWT_ACCESS_TOKEN_EXPIRES=expires))
+        payload = jwt.decode(service.generate_token('u1'), JWT_SECRET, algorithms=['HS256'])
+        assert payload['exp'] - payload['iat'] == ttl
+        assert payload['sub'] == 'u1'
+
+    def test_carries_no_role_claims(self, auth_service):
+        # admin_required checks the user's current Auth claims, not the token
+        payload = jwt.decode(auth_service.generate_token('u1'), JWT_SECRET, algorithms=['HS256'])
+        assert set(payload) == {'exp', 'iat', 'sub'}
+
+    def test_round_trips_through_verify_token(self, auth_service):
+        assert auth_service.verify_token(auth_service.generate_token('u1')) == ('u1', None)
+
+
+class TestVerifyToken:
+    def test_valid_token(self, auth_service):
+        assert auth_service.verify_token(make_token('u1')) == ('u1', None)
+
+    def test_expired_token(self, auth_service):
+        token = make_token('u1', exp=1)
+        assert auth_service.verify_token(token) == (None, 'Token has expired')
+
+    def test_wrong_key(self, auth_service):
+        auth_service.config = SimpleNamespace(JWT_SECRET_KEY='other-secret',
+                                              JWT_ACCESS_TOKEN_EXPIRES=3600)
+        assert auth_service.verify_token(make_token('u1')) == (None, 'Invalid token')
+
+    @pytest.mark.parametrize('tamper', [
+        lambda sig: sig[:10] + '!' + sig[10:],   # skipped by the lenient decoder
+        lambda sig: sig + '=',                   # non-canonical padding
+        lambda sig: sig + '==',
+        lambda sig: sig[:-1] + ('A' if sig[-1] != 'A' else 'B'),
+    ])
+    def test_altered_signature_is_rejected(self, auth_service, tamper):
+        header, payload, signature = make_token('u1').split('.')
+        token = '.'.join((header, payload, tamper(signature)))
+        assert auth_service.verify_token(token) == (None, 'Invalid token')
+
+    def test_malformed_token(self, auth_service):
+        assert auth_service.verify_token('not-a-token') == (None, 'Invalid token')
+
+
+class TestProfileRoute:
+    def test_auth_record_is_looked_up_once(self, app):
+        app.register_blueprint(auth_api.bp, url_prefix='/auth')
+        
+        user = _user('u1')
+        user.email, user.email_verified = 'u1@example.com', True
+        user.user_metadata = SimpleNamespace(creation_timestamp=1)
+        
+        with mock.patch.object(auth, 'get_user', return_value=user) as get_user, \
+                mock.patch.object(auth_api, 'get_db') as get_db:
+            get_db.return_value.collection.return_value.document.return_value.get.return_value = \
+                SimpleNamespace(exists=False)
+            response = app.test_client().get(
+                '/auth/profile', headers={'Authorization': f"Bearer {make_token('u1')}"})
+        
+        assert response.status_code == 200
+        assert response.get_json()['uid'] == 'u1'
+        get_user.assert_called_once_with('u1')
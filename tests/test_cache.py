@@ -0,0 +1,24 @@
+# tests/test_cache.py
+from unittest import mock
+
+from utils import cache
+from utils.cache import TTLCache
+
+
+class TestTTLCache:
+    def test_expired_entries_are_missing(self):
+        entries = TTLCache(ttl=10)
+        with mock.patch.object(cache.time, 'monotonic', return_value=100.0):
+            entries.set('a', 1)
+        with mock.patch.object(cache.time, 'monotonic', return_value=110.0):
+            assert entries.get('a') is None
+
+    def test_full_cache_drops_the_oldest_write(self):
+        entries = TTLCache(ttl=60, maxsize=2)
+        entries.set('a', 1)
+        entries.set('b', 2)
+        entries.set('a', 3)  # rewriting moves 'a' behind 'b'
+        entries.set('c', 4)
+        assert 'b' not in entries
+        assert (entries.get('a'), entries.get('c')) == (3, 4)
+        assert len(entries) == 2
@@ -0,0 +1,21 @@
+# tests/test_config.py
+from flask import Flask
+
+from config import config as app_config
+
+
+class TestConfigInitApp:
+    def test_copies_settings(self):
+        config = app_config.TestingConfig()
+        app = Flask(__name__)
+        
+        config.init_app(app)
+        
+        assert app.config['API_PREFIX'] == '/api/v1'
+        assert app.config['WARMUP_ON_STARTUP'] is False
+        assert app.config['JWT_ACCESS_TOKEN_EXPIRES'] == config.JWT_ACCESS_TOKEN_EXPIRES
+
+    def test_creates_no_directories(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        app_config.TestingConfig().init_app(Flask(__name__))
+        assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,85 @@
+# tests/test_crypto.py
+from unittest import mock
+
+import pytest
+from firebase_admin import auth
+
+from api import crypto as crypto_api
+from services import crypto_service
+from services.crypto_service import CryptoService
+
+from .conftest import make_token
+
+
+@pytest.fixture
+def coingecko():
+    crypto_service._PRICE_CACHE.clear()
+    prices = {'bitcoin': {'usd': 50000.0}, 'ethereum': {'usd': 3000.0}}
+    with mock.patch.object(crypto_service, '_SESSION') as session:
+        session.get.return_value.json.return_value = prices
+        yield session
+    crypto_service._PRICE_CACHE.clear()
+
+
+class TestCryptoPrices:
+    def test_one_request_for_several_symbols(self, coingecko):
+        assert crypto_service.get_crypto_prices(['BTC', 'ETH']) == {'BTC': 50000.0, 'ETH': 3000.0}
+        assert coingecko.get.call_count == 1
+
+    def test_service_and_blueprint_share_the_cache(self, coingecko):
+        assert crypto_api.get_crypto_price('BTC') == 50000.0
+        assert CryptoService(db=mock.Mock()).get_price('BTC') == 50000.0
+        assert coingecko.get.call_count == 1
+
+    def test_unsupported_symbol(self, coingecko):
+        with pytest.raises(Exception, match='Unsupported cryptocurrency'):
+            crypto_service.get_crypto_prices(['DOGE'])
+        coingecko.get.assert_not_called()
+
+
+class TestGetPortfolios:
+    def test_empty_input_skips_firestore(self, coingecko):
+        db = mock.Mock()
+        assert CryptoService(db=db).get_portfolios([]) == {}
+        db.get_all.assert_not_called()
+        coingecko.get.assert_not_called()
+
+    def test_one_read_and_one_price_request(self, coingecko):
+        def snapshot(uid, assets):
+            return mock.Mock(id=uid, exists=assets is not None,
+                             to_dict=lambda: {'assets': assets or {}})
+        db = mock.Mock()
+        db.get_all.return_value = [
+            snapshot('u1', {'BTC': {'quantity': 1, 'avg_price': 40000.0}}),
+            snapshot('u2', None),
+        ]
+        portfolios = CryptoService(db=db).get_portfolios(['u1', 'u2'])
+        
+        assert portfolios['u1']['total_value'] == 50000.0
+        assert portfolios['u2']['assets'] == []
+        assert db.get_all.call_count == 1
+        assert coingecko.get.call_count == 1
+
+
+class TestPortfolioRoute:
+    def _get(self, app, portfolio):
+        app.register_blueprint(crypto_api.bp)
+        user = mock.Mock(uid='u1', disabled=False)
+        with mock.patch.object(auth, 'get_user', return_value=user), \
+                mock.patch.object(crypto_api, 'get_db') as get_db:
+            get_db.return_value.collection.return_value.document.return_value.get.return_value = portfolio
+            return app.test_client().get(
+                '/crypto/portfolio', headers={'Authorization': f"Bearer {make_token('u1')}"})
+
+    def test_missing_portfolio_fetches_no_prices(self, app, coingecko):
+        response = self._get(app, mock.Mock(exists=False))
+        assert response.get_json()['assets'] == []
+        coingecko.get.assert_not_called()
+
+    def test_prices_only_held_assets(self, app, coingecko):
+        portfolio = mock.Mock(exists=True, to_dict=lambda: {
+            'assets': {'BTC': {'quantity': 2, 'avg_price': 40000.0}}})
+        response = self._get(app, portfolio)
+        
+        assert response.get_json()['total_value'] == 100000.0
+        assert 'ids=bitcoin&' in coingecko.get.call_args.args[0]
@@ -0,0 +1,29 @@
+# tests/test_executor.py
+import os
+
+import pytest
+
+from utils.executor import SharedExecutor, reset_executors
+
+
+class TestSharedExecutor:
+    def test_reset_replaces_every_pool(self):
+        executors = [SharedExecutor(2), SharedExecutor(3)]
+        pools = [executor._pool for executor in executors]
+        reset_executors()
+        for executor, pool in zip(executors, pools):
+            assert executor._pool is not pool
+            assert executor.submit(pow, 2, 3).result(timeout=1) == 8
+
+    @pytest.mark.skipif(not hasattr(os, 'fork'), reason='needs fork()')
+    def test_work_runs_in_a_forked_child_after_reset(self):
+        executor = SharedExecutor(2)
+        executor.submit(int).result()  # start pool threads before forking
+        
+        pid = os.fork()
+        if pid == 0:
+            reset_executors()
+            ok = list(executor.map(abs, [-1, -2])) == [1, 2]
+            os._exit(0 if ok else 1)
+        _, status = os.waitpid(pid, 0)
+        assert os.WEXITSTATUS(status) == 0
@@ -0,0 +1,39 @@
+# tests/test_firebase.py
+from unittest import mock
+
+from services import firebase_service
+from services.firebase_service import FirebaseService
+from services.stocks_service import StocksService
+
+
+class TestWarmDb:
+    def test_every_pooled_client_makes_a_call(self):
+        clients = [mock.Mock(), mock.Mock()]
+        firebase_service.reset_db_pool()
+        try:
+            with mock.patch.object(firebase_service, '_create_db_pool', return_value=clients):
+                firebase_service.warm_db()
+        finally:
+            firebase_service.reset_db_pool()
+        
+        for client in clients:
+            client.collection.return_value.document.return_value.get.assert_called_once_with()
+
+
+class TestServiceClients:
+    def test_services_use_the_pool_and_follow_a_reset(self):
+        firebase = FirebaseService()
+        stocks = StocksService(firebase)
+        assert stocks.db is None
+        
+        firebase.initialized = True
+        firebase_service.reset_db_pool()
+        try:
+            with mock.patch.object(firebase_service, '_create_db_pool', return_value=[mock.Mock()]):
+                before = stocks.db
+                assert before is firebase_service.get_db()
+                firebase_service.reset_db_pool()
+            with mock.patch.object(firebase_service, '_create_db_pool', return_value=[mock.Mock()]):
+                assert stocks.db is not before
+        finally:
+            firebase_service.reset_db_pool()
@@ -0,0 +1,136 @@
+# tests/test_stocks.py
+from types import SimpleNamespace
+from unittest import mock
+
+import pandas as pd
+import pytest
+
+from api import stocks as stocks_api
+from services import stocks_service
+from services.stocks_service import StocksService
+
+
+def _doc(doc_id, exists=True, **data):
+    """Stand-in for a Firestore DocumentSnapshot"""
+    return SimpleNamespace(id=doc_id, exists=exists, to_dict=lambda: dict(data))
+
+
+@pytest.fixture
+def stocks(app):
+    db = mock.MagicMock()
+    stocks_service._STOCKS_CACHE.clear()
+    with app.app_context():
+        yield StocksService(SimpleNamespace(db=db)), db
+    stocks_service._STOCKS_CACHE.clear()
+
+
+class TestAllStocks:
+    def test_cursor_without_limit_is_applied(self, stocks):
+        service, db = stocks
+        ordered = db.collection.return_value.order_by.return_value
+        ordered.start_after.return_value.stream.return_value = [_doc('NVDA')]
+        
+        response, status = service.get_all_stocks(start_after='MSFT')
+        
+        assert status == 200
+        assert [stock['id'] for stock in response['stocks']] == ['NVDA']
+        db.collection.return_value.order_by.assert_called_once_with('__name__')
+        ordered.start_after.assert_called_once_with({'__name__': 'MSFT'})
+        ordered.start_after.return_value.limit.assert_not_called()
+
+    def test_page_with_cursor(self, stocks):
+        service, db = stocks
+        ordered = db.collection.return_value.order_by.return_value
+        page = ordered.start_after.return_value.limit.return_value
+        page.stream.return_value = [_doc('NVDA'), _doc('TSLA')]
+        
+        response, _ = service.get_all_stocks(limit=2, start_after='MSFT')
+        
+        assert response['next_cursor'] == 'TSLA'
+        ordered.start_after.return_value.limit.assert_called_once_with(2)
+
+
+class TestStockBySymbol:
+    def test_mutating_a_result_does_not_change_the_cache(self, stocks):
+        service, db = stocks
+        db.collection.return_value.document.return_value.get.return_value = _doc('AAPL', price=1)
+        
+        first, _ = service.get_stock_by_symbol('AAPL')
+        first['stock']['price'] = 2
+        second, _ = service.get_stock_by_symbol('AAPL')
+        second['status'] = 'changed'
+        third, _ = service.get_stock_by_symbol('AAPL')
+        
+        assert (third['stock']['price'], third['status']) == (1, 'success')
+        assert db.collection.return_value.document.return_value.get.call_count == 1
+
+
+class TestPriceHistory:
+    @pytest.mark.parametrize('limit', [0, -1, 'ten', None])
+    def test_invalid_limit(self, stocks, limit):
+        service, db = stocks
+        _, status = service.get_stock_price_history('AAPL', limit=limit)
+        assert status == 400
+        db.collection.assert_not_called()
+
+    def test_full_page_returns_cursor(self, stocks):
+        service, db = stocks
+        stock_ref = db.collection.return_value.document.return_value
+        stock_ref.get.return_value = _doc('AAPL')
+        query = stock_ref.collection.return_value.order_by.return_value
+        query.limit.return_value.stream.return_value = [_doc('h2', price=2), _doc('h1', price=1)]
+        
+        response, status = service.get_stock_price_history('AAPL', limit=2)
+        
+        assert status == 200
+        assert [entry['id'] for entry in response['price_history']] == ['h2', 'h1']
+        assert response['next_cursor'] == 'h1'
+        query.limit.assert_called_once_with(2)
+
+    def test_short_page_has_no_cursor(self, stocks):
+        service, db = stocks
+        stock_ref = db.collection.return_value.document.return_value
+        stock_ref.get.return_value = _doc('AAPL')
+        query = stock_ref.collection.return_value.order_by.return_value
+        query.limit.return_value.stream.return_value = []
+        
+        response, _ = service.get_stock_price_history('AAPL', limit=5)
+        assert response['next_cursor'] is None
+
+    def test_missing_stock(self, stocks):
+        service, db = stocks
+        db.collection.return_value.document.return_value.get.return_value = _doc('AAPL', exists=False)
+        _, status = service.get_stock_price_history('AAPL')
+        assert status == 404
+
+
+class TestStocksBySymbols:
+    def test_empty_input_skips_firestore(self, stocks):
+        service, db = stocks
+        response, status = service.get_stocks_by_symbols([])
+        assert (status, response['count']) == (200, 0)
+        db.get_all.assert_not_called()
+
+    def test_found_and_missing(self, stocks):
+        service, db = stocks
+        db.get_all.return_value = [_doc('AAPL', name='Apple'), _doc('NOPE', exists=False)]
+        response, _ = service.get_stocks_by_symbols(['AAPL', 'NOPE', 'AAPL'])
+        assert response['stocks'] == {'AAPL': {'name': 'Apple', 'id': 'AAPL'}}
+        assert response['missing'] == ['NOPE']
+        assert len(db.get_all.call_args.args[0]) == 2
+
+
+class TestFetchQuote:
+    def _ticker(self, fast_info_error):
+        ticker = mock.MagicMock(ticker='AAPL', info={'previousClose': 100.0})
+        type(ticker).fast_info = mock.PropertyMock(side_effect=fast_info_error)
+        ticker.history.return_value = pd.DataFrame({'Close': [101.0]})
+        return ticker
+
+    def test_falls_back_to_history_when_fast_info_fails(self, app):
+        with app.app_context():
+            assert stocks_api._fetch_quote(self._ticker(KeyError('last_price'))) == (101.0, 100.0)
+
+    def test_unexpected_errors_propagate(self, app):
+        with app.app_context(), pytest.raises(RuntimeError):
+            stocks_api._fetch_quote(self._ticker(RuntimeError('bug')))
@@ -0,0 +1,166 @@
+# tests/test_users.py
+from types import SimpleNamespace
+from unittest import mock
+
+import pytest
+from firebase_admin import auth, exceptions
+from google.api_core.exceptions import ServiceUnavailable
+
+from api import users as users_api
+from services import users_service
+from services.users_service import UsersService
+from utils.validators import invalidate_cached_user
+
+from .conftest import make_token
+
+
+def _auth_user(uid, custom_claims=None):
+    """Stand-in for a Firebase Auth UserRecord"""
+    metadata = SimpleNamespace(creation_timestamp=1, last_sign_in_timestamp=2)
+    return SimpleNamespace(uid=uid, email=f'{uid}@example.com', email_verified=True,
+                           display_name=None, disabled=False, custom_claims=custom_claims,
+                           user_metadata=metadata)
+
+
+def _profile(uid, **data):
+    return SimpleNamespace(id=uid, exists=True, to_dict=lambda: data)
+
+
+@pytest.fixture
+def users(app):
+    db = mock.MagicMock()
+    with app.app_context():
+        yield UsersService(SimpleNamespace(db=db)), db
+    users_service._USER_CACHE.clear()
+
+
+def _single_page(*uids):
+    page = SimpleNamespace(users=[_auth_user(uid) for uid in uids], next_page_token='')
+    page.get_next_page = lambda: None
+    return page
+
+
+class TestGetAllUsers:
+    def test_profiles_are_merged(self, users):
+        service, db = users
+        db.get_all.return_value = [_profile('u1', role='admin')]
+        with mock.patch.object(auth, 'list_users', return_value=_single_page('u1')):
+            response, status = service.get_all_users()
+        assert status == 200
+        assert response['users'][0]['role'] == 'admin'
+        assert 'read_time' in db.get_all.call_args.kwargs
+
+    def test_firestore_outage_degrades_to_auth_data(self, users):
+        service, db = users
+        db.get_all.side_effect = ServiceUnavailable('unavailable')
+        with mock.patch.object(auth, 'list_users', return_value=_single_page('u1')):
+            response, status = service.get_all_users()
+        assert status == 200
+        assert response['users'][0]['uid'] == 'u1'
+
+    def test_every_page_is_read_from_one_snapshot(self, users):
+        service, db = users
+        second = _single_page('u2')
+        first = _single_page('u1')
+        first.get_next_page = lambda: second
+        db.get_all.side_effect = lambda refs, **kwargs: [_profile(ref.id) for ref in refs]
+        db.collection.return_value.document.side_effect = lambda uid: SimpleNamespace(id=uid)
+        with mock.patch.object(auth, 'list_users', return_value=first):
+            pages = list(service.iter_user_pages())
+        
+        assert [[user.uid for user, _ in users_] for users_, _ in pages] == [['u1'], ['u2']]
+        read_times = {call.kwargs['read_time'] for call in db.get_all.call_args_list}
+        assert len(read_times) == 1
+
+    def test_bad_page_args(self, users):
+        service, _ = users
+        response, status = service.get_all_users(page_size=0)
+        assert status == 400
+        with pytest.raises(users_service.PageArgumentError):
+            next(service.iter_user_pages(page_token='cursor'))
+
+    def test_programming_errors_are_not_swallowed(self, users):
+        service, db = users
+        db.get_all.side_effect = TypeError("unexpected keyword argument 'read_time'")
+        with mock.patch.object(auth, 'list_users', return_value=_single_page('u1')):
+            _, status = service.get_all_users()
+        assert status == 500
+
+
+class TestUserCacheInvalidation:
+    def test_auth_updates_clear_merged_lookups(self, users):
+        service, db = users
+        db.collection.return_value.document.return_value.get.return_value = SimpleNamespace(exists=False)
+        with mock.patch.object(auth, 'get_user', return_value=_auth_user('u1')), \
+                mock.patch.object(auth, 'get_user_by_email', return_value=_auth_user('u1')):
+            service.get_user_by_id('u1')
+        assert ('id', 'u1') in users_service._USER_CACHE
+        assert ('email', 'u1@example.com') in users_service._USER_CACHE
+        
+        # e.g. FirebaseService.disable_user, or the PUT /users/<id> route
+        invalidate_cached_user('u1')
+        
+        assert ('id', 'u1') not in users_service._USER_CACHE
+        assert ('email', 'u1@example.com') not in users_service._USER_CACHE
+
+
+@pytest.fixture
+def admin_client(app):
+    """Test client for the users blueprint, authenticated as an admin"""
+    app.register_blueprint(users_api.bp, url_prefix='/users')
+    client = app.test_client()
+    headers = {'Authorization': f"Bearer {make_token('admin')}"}
+    admin = _auth_user('admin', custom_claims={'admin': True})
+    db = mock.MagicMock()
+    db.get_all.return_value = [_profile('u1', role='admin')]
+    with mock.patch.object(auth, 'get_user', return_value=admin), \
+            mock.patch.object(users_api.bp, 'services', {'users': UsersService(SimpleNamespace(db=db))},
+                              create=True):
+        yield lambda url: client.get(url, headers=headers)
+
+
+class TestListUsersRoute:
+    def test_complete_listing(self, admin_client):
+        with mock.patch.object(auth, 'list_users', return_value=_single_page('u1', 'u2')):
+            body = admin_client('/users/admin/all').get_json()
+        assert [user['uid'] for user in body['users']] == ['u1', 'u2']
+        assert body['users'][0]['profile_data'] == {'role': 'admin'}
+        assert body['count'] == 2
+        assert body['complete'] is True
+        assert 'next_cursor' not in body
+
+    def test_failure_after_first_page_is_reported(self, admin_client):
+        page = _single_page('u1')
+        page.get_next_page = mock.Mock(side_effect=auth.UnexpectedResponseError('boom'))
+        with mock.patch.object(auth, 'list_users', return_value=page):
+            response = admin_client('/users/admin/all')
+        body = response.get_json()
+        assert response.status_code == 200
+        assert body['count'] == 1
+        assert body['complete'] is False
+        assert 'boom' in body['error']
+
+    def test_failure_on_first_page_is_an_error_response(self, admin_client):
+        with mock.patch.object(auth, 'list_users', side_effect=auth.UnexpectedResponseError('boom')):
+            assert admin_client('/users/admin/all').status_code == 500
+
+    @pytest.mark.parametrize('query', ['page_size=abc', 'page_size=0', 'page_size=1001',
+                                       'page_size=', 'page_token=abc'])
+    def test_bad_page_args_are_rejected(self, admin_client, query):
+        with mock.patch.object(auth, 'list_users') as list_users:
+            assert admin_client(f'/users/admin/all?{query}').status_code == 400
+        list_users.assert_not_called()
+
+    def test_unknown_page_token_is_rejected(self, admin_client):
+        error = exceptions.InvalidArgumentError('INVALID_PAGE_SELECTION')
+        with mock.patch.object(auth, 'list_users', side_effect=error):
+            response = admin_client('/users/admin/all?page_size=10&page_token=garbage')
+        assert response.status_code == 400
+
+    def test_single_page(self, admin_client):
+        page = _single_page('u1')
+        page.next_page_token = 'next'
+        with mock.patch.object(auth, 'list_users', return_value=page) as list_users:
+            body = admin_client('/users/admin/all?page_size=1').get_json()
+        list_users.assert_called_once_with(page_token=None, max_results=1)
+        assert body['next_cursor'] == 'next'
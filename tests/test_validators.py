@@ -0,0 +1,38 @@
+# tests/test_validators.py
+import pytest
+
+from utils.validators import validate_page_args, validate_stock_data, validate_user_data
+
+
+class TestValidateUserData:
+    @pytest.mark.parametrize('email', ['a@b.co', 'first.last@example.org'])
+    def test_valid_email(self, email):
+        assert validate_user_data({'email': email}) is None
+
+    @pytest.mark.parametrize('email', ['a@b.co\n', 'a@b', 'a b@c.co', '@b.co', 'a@@b.co', 42])
+    def test_invalid_email(self, email):
+        assert validate_user_data({'email': email}) == "Invalid email format"
+
+    def test_short_password(self):
+        assert validate_user_data({'password': '12345'}) == "Password must be at least 6 characters"
+
+
+class TestValidatePageArgs:
+    @pytest.mark.parametrize('page_size, page_token', [(None, None), ('1', None), (1000, 'cursor')])
+    def test_valid(self, page_size, page_token):
+        assert validate_page_args(page_size, page_token) is None
+
+    @pytest.mark.parametrize('page_size, page_token', [
+        ('abc', None), ('1.5', None), (0, None), (1001, None), (10, ''), (None, 'cursor')
+    ])
+    def test_invalid(self, page_size, page_token):
+        assert validate_page_args(page_size, page_token) is not None
+
+
+class TestValidateStockData:
+    def test_missing_fields_in_order(self):
+        assert validate_stock_data({'name': 'Apple'}) == "Missing required fields: symbol, price"
+
+    def test_non_positive_price(self):
+        assert validate_stock_data({'symbol': 'AAPL', 'name': 'Apple', 'price': 0}) == \
+            "Price must be greater than 0"